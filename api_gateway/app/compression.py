@@ -0,0 +1,187 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Bodies that already carry a Content-Encoding (compressed by the upstream for
+the Accept-Encoding the proxy forwarded) pass through untouched. Streamed
+bodies (SSE, NDJSON export) are compressed chunk by chunk and flushed after
+every chunk, so clients still see each event as it is sent.
+"""
+from __future__ import annotations
+
+import time
+import zlib
+
+from opentelemetry import metrics, trace
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from common.config import Settings
+
+try:
+    import brotli
+except ImportError:  # optional: br is simply not offered
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # optional: zstd is simply not offered
+    zstandard = None
+
+# bodies larger than this are compressed in the threadpool instead of on the event loop
+OFFLOAD_BYTES = 64 * 1024
+
+class GzipEncoder:
+    def __init__(self):
+        self._c = zlib.compressobj(5, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class BrotliEncoder:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._c.process(data) + (self._c.finish() if final else self._c.flush())
+
+class ZstdEncoder:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._c.compress(data) + self._c.flush(mode)
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+meter = metrics.get_meter("api_gateway.compression")
+cpu_time_ms = meter.create_histogram("gateway.compression.cpu_time", unit="ms",
+                                     description="CPU time spent compressing one response")
+ratio = meter.create_histogram("gateway.compression.ratio", unit="1",
+                               description="compressed / original size of one response")
+bytes_in = meter.create_counter("gateway.compression.bytes_in", unit="By")
+bytes_out = meter.create_counter("gateway.compression.bytes_out", unit="By")
+
+def negotiate(accept_encoding: str, preference: list[str]) -> str | None:
+    """Best encoding of `preference` (server order breaks ties) the client accepts, or None."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for name in preference:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+def _encode(encoder, data: bytes, final: bool) -> tuple[bytes, float]:
+    started = time.thread_time()
+    out = encoder.compress(data, final)
+    return out, (time.thread_time() - started) * 1000
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; the response start is held back until the first
+    body chunk shows whether the response is worth compressing."""
+    def __init__(self, app, settings: Settings):
+        self.app = app
+        self.min_size = settings.compression_min_size
+        self.content_types = tuple(t.strip().lower() for t in settings.compression_content_types.split(",") if t.strip())
+        self.encodings = [e.strip() for e in settings.compression_encodings.split(",") if e.strip() in ENCODERS]
+
+    def compressible(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if not media_type.startswith(self.content_types):
+            return False
+        if not more_body:
+            return len(body) >= self.min_size
+        length = headers.get("content-length")
+        return length is None or int(length) >= self.min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        encoder = None
+        media_type = ""
+        total_in = total_out = 0
+        cpu_ms = 0.0
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, media_type, total_in, total_out, cpu_ms
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = None
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                if self.compressible(headers, body, more_body):
+                    encoder = ENCODERS[encoding]()
+                    media_type = headers.get("content-type", "").split(";")[0].strip()
+                    headers["content-encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                else:
+                    await send(start)
+                    start = None
+            if encoder is None:
+                await send(message)
+                return
+
+            if len(body) > OFFLOAD_BYTES:
+                out, spent = await run_in_threadpool(_encode, encoder, body, not more_body)
+            else:
+                out, spent = _encode(encoder, body, not more_body)
+            total_in += len(body)
+            total_out += len(out)
+            cpu_ms += spent
+            if start is not None:
+                # a single body keeps its length; a streamed one goes out chunked
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    headers["content-length"] = str(len(out))
+                await send(start)
+                start = None
+            if not more_body:
+                self.record(encoding, media_type, total_in, total_out, cpu_ms)
+            await send({"type": "http.response.body", "body": out, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def record(encoding: str, media_type: str, size_in: int, size_out: int, cpu_ms: float) -> None:
+        attrs = {"encoding": encoding, "content_type": media_type}
+        cpu_time_ms.record(cpu_ms, attrs)
+        if size_in:
+            ratio.record(size_out / size_in, attrs)
+        bytes_in.add(size_in, attrs)
+        bytes_out.add(size_out, attrs)
+        span = trace.get_current_span()
+        span.set_attribute("http.response.compression.encoding", encoding)
+        span.set_attribute("http.response.compression.bytes_in", size_in)
+        span.set_attribute("http.response.compression.bytes_out", size_out)
+        span.set_attribute("http.response.compression.cpu_ms", cpu_ms)
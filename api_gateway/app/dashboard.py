@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+from fastapi import Request
+
+from common.config import Settings
+from common.http import REQUEST_ID_HEADER
+
+# section name -> (upstream, path); fetched concurrently for GET /v1/dashboard
+SECTIONS = {
+    "profile": ("users", "/v1/users/me"),
+    "orders": ("orders", "/v1/orders"),
+}
+
+async def fetch_section(client: httpx.AsyncClient, path: str, params: dict, headers: dict, timeout: float) -> tuple[object, dict | None]:
+    """Return (data, None) on success or (None, error) without raising, so one
+    failing upstream only blanks its own section."""
+    try:
+        r = await asyncio.wait_for(client.get(path, params=params, headers=headers), timeout=timeout)
+    except (httpx.HTTPError, asyncio.TimeoutError) as e:
+        return None, {"code": "UPSTREAM_UNAVAILABLE", "message": str(e) or type(e).__name__}
+    try:
+        body = r.json()
+    except ValueError:
+        body = None
+    if r.status_code == 200 and isinstance(body, dict) and body.get("success"):
+        return body.get("data"), None
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        return None, {**body["error"], "status": r.status_code}
+    return None, {"code": "UPSTREAM_ERROR", "message": f"Upstream responded with {r.status_code}", "status": r.status_code}
+
+async def build_dashboard(request: Request, client_for, request_id: str, orders_page_size: int) -> dict:
+    settings: Settings = request.app.state.settings
+    headers = {"Authorization": request.headers["Authorization"], REQUEST_ID_HEADER: request_id}
+    params = {"orders": {"page": 1, "page_size": orders_page_size}}
+
+    results = await asyncio.gather(*(
+        fetch_section(client_for(upstream), path, params.get(name, {}), headers, settings.dashboard_section_timeout)
+        for name, (upstream, path) in SECTIONS.items()
+    ))
+
+    data: dict = {}
+    errors: dict = {}
+    for name, (section, error) in zip(SECTIONS, results):
+        data[name] = section
+        if error is not None:
+            errors[name] = error
+    data["errors"] = errors
+    return data
@@ -1,46 +1,32 @@
 from __future__ import annotations
 
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
 import httpx
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, StreamingResponse
 from starlette.datastructures import Headers
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 
-from common.config import settings
+from common.config import Settings, settings as default_settings
+from common.clients import make_async_client
 from common.http import get_or_create_request_id, set_request_id, REQUEST_ID_HEADER
 from common.auth import get_bearer_token, decode_token, JwtError
-from common.responses import fail
+from common.responses import ok, fail
 from common.logging import setup_logging, get_logger
-from common.tracing import setup_tracing
-
-setup_logging("api_gateway")
-setup_tracing("api_gateway", settings.otel_service_namespace, settings.otel_exporter_otlp_endpoint)
-HTTPXClientInstrumentor().instrument()
-
-limiter = Limiter(key_func=get_remote_address, default_limits=[settings.rate_limit])
+from common.tracing import setup_tracing, setup_metrics
+from common.profiling import ProfilingMiddleware
 
-app = FastAPI(title="API Gateway", version="1.0.0", openapi_url="/openapi.json")
-app.state.limiter = limiter
+from .compression import CompressionMiddleware
+from .dashboard import SECTIONS as DASHBOARD_SECTIONS, build_dashboard
+from .monolith import embedded_services
 
-app.add_exception_handler(RateLimitExceeded, lambda r, e: JSONResponse(
-    status_code=429,
-    content={"success": False, "error": {"code": "RATE_LIMIT", "message": "Too many requests"}},
-))
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[o.strip() for o in settings.cors_allow_origins.split(",")] if settings.cors_allow_origins != "*" else ["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-FastAPIInstrumentor.instrument_app(app)
 log = get_logger("api_gateway")
 
 PUBLIC_PATHS = {
@@ -59,7 +45,7 @@ def is_protected(method: str, path: str) -> bool:
         return True
     return False
 
-def verify_jwt_from_request(request: Request) -> dict | None:
+def verify_jwt_from_request(request: Request, settings: Settings) -> dict | None:
     token = get_bearer_token(request.headers.get("Authorization"))
     if not token:
         return None
@@ -68,16 +54,38 @@ def verify_jwt_from_request(request: Request) -> dict | None:
     except JwtError:
         return None
 
-async def proxy(request: Request, upstream_base: str) -> Response:
+# long-lived responses; proxied over a separate pool so open streams cannot starve regular requests
+STREAM_PATHS = {"/v1/orders/events"}
+# upstream bodies relayed chunk by chunk instead of being buffered (SSE, admin export)
+STREAM_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+def is_event_stream(request: Request) -> bool:
+    return request.url.path in STREAM_PATHS or "text/event-stream" in request.headers.get("accept", "")
+
+def upstream_client(app: FastAPI, name: str, stream: bool = False) -> httpx.AsyncClient:
+    # pooled per upstream; normally opened by the lifespan, created lazily when the app is driven without it
+    key = f"{name}:stream" if stream else name
+    clients = app.state.upstreams
+    if key not in clients:
+        settings: Settings = app.state.settings
+        base_url = {"users": settings.users_service_url, "orders": settings.orders_service_url}[name]
+        if stream:
+            # one upstream connection per subscriber, held for the life of the stream
+            clients[key] = make_async_client(base_url, timeout=30.0, max_connections=None, max_keepalive_connections=0)
+        else:
+            clients[key] = make_async_client(base_url, timeout=30.0)
+    return clients[key]
+
+async def proxy(request: Request, upstream: str) -> Response:
     request_id = get_or_create_request_id(request)
 
     if is_protected(request.method, request.url.path):
-        payload = verify_jwt_from_request(request)
+        payload = verify_jwt_from_request(request, request.app.state.settings)
         if not payload:
             return fail("UNAUTHORIZED", "Missing or invalid token", 401)
 
     # Build upstream URL
-    upstream_url = f"{upstream_base}{request.url.path}"
+    upstream_url = request.url.path
     if request.url.query:
         upstream_url += f"?{request.url.query}"
 
@@ -85,43 +93,149 @@ async def proxy(request: Request, upstream_base: str) -> Response:
     headers = dict(request.headers)
     headers[REQUEST_ID_HEADER] = request_id
     headers.pop("host", None)
+    # compressed upstream bodies are relayed as they are, so ask only for what the client accepts
+    # (otherwise httpx adds its own default Accept-Encoding)
+    headers["accept-encoding"] = request.headers.get("accept-encoding", "identity")
 
     body = await request.body()
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        upstream_resp = await client.request(
-            method=request.method,
-            url=upstream_url,
-            headers=headers,
-            content=body,
-        )
-
-    response = Response(
-        content=upstream_resp.content,
-        status_code=upstream_resp.status_code,
-        media_type=upstream_resp.headers.get("content-type"),
+    client = upstream_client(request.app, upstream, stream=is_event_stream(request))
+    upstream_req = client.build_request(
+        method=request.method,
+        url=upstream_url,
+        headers=headers,
+        content=body,
     )
+    upstream_resp = await client.send(upstream_req, stream=True)
+
+    media_type = upstream_resp.headers.get("content-type")
+    if media_type and media_type.startswith(STREAM_MEDIA_TYPES):
+        # long-lived stream (order events, export): relay chunks as they arrive
+        # and release the upstream connection once the client goes away
+        stream_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        if upstream_resp.headers.get("content-encoding"):
+            stream_headers["Content-Encoding"] = upstream_resp.headers["content-encoding"]
+        response = StreamingResponse(
+            upstream_resp.aiter_raw(),
+            status_code=upstream_resp.status_code,
+            media_type=media_type,
+            headers=stream_headers,
+            background=BackgroundTask(upstream_resp.aclose),
+        )
+    elif upstream_resp.headers.get("content-encoding"):
+        # compressed upstream (for the Accept-Encoding forwarded above): relay the bytes as they are
+        try:
+            content = b"".join([chunk async for chunk in upstream_resp.aiter_raw()])
+        finally:
+            await upstream_resp.aclose()
+        response = Response(
+            content=content,
+            status_code=upstream_resp.status_code,
+            media_type=media_type,
+            headers={"Content-Encoding": upstream_resp.headers["content-encoding"], "Vary": "Accept-Encoding"},
+        )
+    else:
+        await upstream_resp.aread()
+        response = Response(
+            content=upstream_resp.content,
+            status_code=upstream_resp.status_code,
+            media_type=media_type,
+        )
     # Propagate request id back
     set_request_id(response, request_id)
     return response
 
-@app.get("/health")
-def health():
-    return {"success": True, "data": {"status": "ok", "env": settings.app_env}}
-
-# Users proxy
-@app.api_route("/v1/users/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
-@limiter.limit(settings.rate_limit)
-async def users_proxy(path: str, request: Request):
-    return await proxy(request, settings.users_service_url)
-
-# Orders proxy
-@app.api_route("/v1/orders/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
-@limiter.limit(settings.rate_limit)
-async def orders_proxy(path: str, request: Request):
-    return await proxy(request, settings.orders_service_url)
-
-# Root helpers
-@app.get("/")
-def root():
-    return {"success": True, "data": {"message": "API Gateway. Use /docs for Swagger UI."}}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # runs in every worker after fork: tracing exporter thread and upstream pools live here
+    started = time.perf_counter()
+    settings: Settings = app.state.settings
+    setup_logging("api_gateway")
+    provider = setup_tracing("api_gateway", settings.otel_service_namespace, settings.otel_exporter_otlp_endpoint)
+    meter_provider = setup_metrics("api_gateway", settings.otel_service_namespace, settings.otel_exporter_otlp_metrics_endpoint)
+    async with AsyncExitStack() as stack:
+        if settings.gateway_mode == "monolith":
+            app.state.upstreams = await stack.enter_async_context(embedded_services(app))
+        else:
+            for name in ("users", "orders"):
+                stack.push_async_callback(upstream_client(app, name).aclose)
+                stack.push_async_callback(upstream_client(app, name, stream=True).aclose)
+        app.state.startup_ms = (time.perf_counter() - started) * 1000
+        log.info("startup completed in %.1f ms (%s mode)", app.state.startup_ms, settings.gateway_mode)
+        try:
+            yield
+        finally:
+            app.state.upstreams = {}
+    provider.shutdown()
+    if meter_provider is not None:
+        meter_provider.shutdown()
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    settings = settings or default_settings
+    limiter = Limiter(key_func=get_remote_address, default_limits=[settings.rate_limit])
+
+    app = FastAPI(title="API Gateway", version="1.0.0", openapi_url="/openapi.json", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.limiter = limiter
+    app.state.upstreams = {}
+
+    app.add_exception_handler(RateLimitExceeded, lambda r, e: JSONResponse(
+        status_code=429,
+        content={"success": False, "error": {"code": "RATE_LIMIT", "message": "Too many requests"}},
+    ))
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[o.strip() for o in settings.cors_allow_origins.split(",")] if settings.cors_allow_origins != "*" else ["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(CompressionMiddleware, settings=settings)
+    app.add_middleware(ProfilingMiddleware, service_name="api_gateway", settings=settings)
+    FastAPIInstrumentor.instrument_app(app)
+
+    @app.get("/health")
+    def health():
+        return {"success": True, "data": {"status": "ok", "env": settings.app_env}}
+
+    # Users proxy (the bare prefix is routed explicitly, otherwise it is redirected to "/v1/users/")
+    @app.api_route("/v1/users", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    @app.api_route("/v1/users/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    @limiter.limit(settings.rate_limit)
+    async def users_proxy(request: Request, path: str = ""):
+        return await proxy(request, "users")
+
+    # Orders proxy
+    @app.api_route("/v1/orders", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    @app.api_route("/v1/orders/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    @limiter.limit(settings.rate_limit)
+    async def orders_proxy(request: Request, path: str = ""):
+        return await proxy(request, "orders")
+
+    # Home screen in one round trip: token verified and rate limit counted once,
+    # profile and recent orders fetched concurrently; failed sections are listed in "errors"
+    @app.get("/v1/dashboard")
+    @limiter.limit(settings.rate_limit)
+    async def dashboard(request: Request, orders_page_size: int = Query(5, ge=1, le=100)):
+        request_id = get_or_create_request_id(request)
+        if not verify_jwt_from_request(request, settings):
+            response = fail("UNAUTHORIZED", "Missing or invalid token", 401)
+        else:
+            data = await build_dashboard(request, lambda name: upstream_client(app, name), request_id, orders_page_size)
+            if len(data["errors"]) == len(DASHBOARD_SECTIONS):
+                response = fail("UPSTREAM_UNAVAILABLE", "No dashboard section could be loaded", 502)
+            else:
+                response = JSONResponse(ok(data))
+        set_request_id(response, request_id)
+        return response
+
+    # Root helpers
+    @app.get("/")
+    def root():
+        return {"success": True, "data": {"message": "API Gateway. Use /docs for Swagger UI."}}
+
+    return app
+
+app = create_app()
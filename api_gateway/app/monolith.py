@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator
+
+import httpx
+from fastapi import FastAPI
+
+from common.clients import make_async_client
+
+class _ASGIResponseStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: asyncio.Queue, task: asyncio.Task, disconnected: asyncio.Event):
+        self._chunks = chunks
+        self._task = task
+        self._disconnected = disconnected
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self) -> None:
+        self._disconnected.set()
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """Like httpx.ASGITransport, but returns as soon as the app starts its
+    response and streams the body while the app is still producing it.
+
+    httpx's transport waits for the whole body, which never happens for an
+    endless SSE response. Closing the response sends http.disconnect to the
+    app and cancels it if it is still running.
+    """
+    def __init__(self, app: Any, client: tuple[str, int] = ("127.0.0.1", 123)):
+        self.app = app
+        self.client = client
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([chunk async for chunk in request.stream])
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "headers": [(k.lower(), v) for (k, v) in request.headers.raw],
+            "scheme": request.url.scheme,
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "server": (request.url.host, request.url.port),
+            "client": self.client,
+            "root_path": "",
+        }
+
+        request_sent = False
+        disconnected = asyncio.Event()
+        started: asyncio.Future = asyncio.get_running_loop().create_future()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        async def receive() -> dict:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                started.set_result(message)
+            elif message["type"] == "http.response.body":
+                if message.get("body") and request.method != "HEAD":
+                    chunks.put_nowait(message["body"])
+                if not message.get("more_body", False):
+                    chunks.put_nowait(None)
+
+        async def run() -> None:
+            try:
+                await self.app(scope, receive, send)
+            except Exception as exc:
+                if not started.done():
+                    started.set_exception(exc)
+            finally:
+                if not started.done():
+                    started.set_exception(RuntimeError("ASGI app returned without starting a response"))
+                chunks.put_nowait(None)
+
+        task = asyncio.create_task(run())
+        start = await started
+        return httpx.Response(
+            start["status"],
+            headers=start.get("headers", []),
+            stream=_ASGIResponseStream(chunks, task, disconnected),
+        )
+
+@asynccontextmanager
+async def embedded_services(app: FastAPI) -> AsyncIterator[dict[str, httpx.AsyncClient]]:
+    """Run service_users and service_orders inside the gateway process.
+
+    Yields upstream clients that dispatch through a streaming ASGI transport
+    instead of TCP, so proxy() keeps its auth, rate-limit and request-id handling and only
+    the hop is gone. Orders' user check becomes a direct lookup in the users DB.
+    The services are imported here so the network-mode image does not need them.
+    """
+    from service_users.app.main import create_app as create_users_app
+    from service_users.app.internal import make_user_checker
+    from service_orders.app.main import create_app as create_orders_app
+
+    settings = app.state.settings
+    users_app = create_users_app(settings, embedded=True)
+    orders_app = create_orders_app(settings, embedded=True)
+    orders_app.state.user_checker = make_user_checker(users_app)
+    app.state.embedded_apps = {"users": users_app, "orders": orders_app}
+
+    async with AsyncExitStack() as stack:
+        clients: dict[str, httpx.AsyncClient] = {}
+        for name, sub_app in app.state.embedded_apps.items():
+            await stack.enter_async_context(sub_app.router.lifespan_context(sub_app))
+            clients[name] = await stack.enter_async_context(make_async_client(
+                f"http://{name}.internal",
+                timeout=30.0,
+                transport=StreamingASGITransport(sub_app),
+            ))
+            # no connection pool in-process, so event streams can share the client
+            clients[f"{name}:stream"] = clients[name]
+        yield clients
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BENCH_JWT_SECRET = "bench-secret"
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # any HTTP answer means the server accepts connections
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready in {timeout}s")
+
+
+@dataclass
+class ServiceProcess:
+    name: str
+    app: str
+    port: int
+    env: dict
+    log_path: Path
+    proc: subprocess.Popen | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        log = open(self.log_path, "wb")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT,
+            env={**os.environ, **self.env},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        log.close()
+
+    def stop(self) -> None:
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+@dataclass
+class Stack:
+    """The system under test as local uvicorn processes on temporary SQLite files.
+
+    In "network" mode these are the gateway, users and orders services; in
+    "monolith" mode only the gateway runs, hosting both services in-process.
+    """
+    workdir: Path
+    mode: str
+    gateway: ServiceProcess
+    users_db_url: str
+    orders_db_url: str
+    services: list[ServiceProcess] = field(default_factory=list)
+
+    def start(self) -> None:
+        for svc in (*self.services, self.gateway):
+            svc.start()
+        for svc in (*self.services, self.gateway):
+            wait_ready(svc.url + "/docs")
+
+    def stop(self) -> None:
+        for svc in (self.gateway, *reversed(self.services)):
+            svc.stop()
+
+    def __enter__(self) -> "Stack":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def make_stack(workdir: str | None = None, extra_env: dict | None = None, mode: str = "network") -> Stack:
+    wd = Path(workdir or tempfile.mkdtemp(prefix="microbench-"))
+    wd.mkdir(parents=True, exist_ok=True)
+    users_port, orders_port, gateway_port = free_port(), free_port(), free_port()
+    common_env = {
+        "APP_ENV": "bench",
+        "JWT_SECRET": BENCH_JWT_SECRET,
+        "GATEWAY_MODE": mode,
+        "USERS_SERVICE_URL": f"http://127.0.0.1:{users_port}",
+        "ORDERS_SERVICE_URL": f"http://127.0.0.1:{orders_port}",
+        # the benchmark measures throughput, not the limiter
+        "RATE_LIMIT": "100000000/minute",
+        **(extra_env or {}),
+    }
+
+    if mode == "monolith":
+        # one process and one database file holding both services' tables
+        db_url = f"sqlite:///{wd / 'monolith.db'}"
+        gateway = ServiceProcess(
+            "api_gateway", "api_gateway.app.main:app", gateway_port,
+            {**common_env, "SERVICE_NAME": "api_gateway", "DATABASE_URL": db_url},
+            wd / "api_gateway.log",
+        )
+        return Stack(workdir=wd, mode=mode, gateway=gateway, users_db_url=db_url, orders_db_url=db_url)
+
+    users_db_url = f"sqlite:///{wd / 'users.db'}"
+    orders_db_url = f"sqlite:///{wd / 'orders.db'}"
+    users = ServiceProcess(
+        "service_users", "service_users.app.main:app", users_port,
+        {**common_env, "SERVICE_NAME": "service_users", "DATABASE_URL": users_db_url},
+        wd / "service_users.log",
+    )
+    orders = ServiceProcess(
+        "service_orders", "service_orders.app.main:app", orders_port,
+        {**common_env, "SERVICE_NAME": "service_orders", "DATABASE_URL": orders_db_url},
+        wd / "service_orders.log",
+    )
+    gateway = ServiceProcess(
+        "api_gateway", "api_gateway.app.main:app", gateway_port,
+        {**common_env, "SERVICE_NAME": "api_gateway"},
+        wd / "api_gateway.log",
+    )
+    return Stack(workdir=wd, mode=mode, gateway=gateway, users_db_url=users_db_url,
+                 orders_db_url=orders_db_url, services=[users, orders])
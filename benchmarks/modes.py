@@ -0,0 +1,51 @@
+"""Latency of network mode vs monolith mode under the same workload.
+
+    python -m benchmarks.modes --users 100 --concurrency 16 --duration 20
+
+Accepts the same options as `benchmarks.run` and runs the workload once per
+mode. Prints both reports plus the per-endpoint p50/p95/p99 and RPS ratio
+(monolith / network) as JSON.
+"""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+from .run import parse_args, run_once
+
+
+def diff(network: dict, monolith: dict) -> dict:
+    out: dict[str, dict] = {}
+    for name, net in network["endpoints"].items():
+        mono = monolith["endpoints"].get(name)
+        if mono is None:
+            continue
+        out[name] = {
+            key: round(mono[key] / net[key], 3) if net[key] else None
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    network = run_once(args, "network")
+    monolith = run_once(args, "monolith")
+    report = {
+        "network": network,
+        "monolith": monolith,
+        "monolith_vs_network": {"total": diff({"endpoints": {"total": network["total"]}},
+                                              {"endpoints": {"total": monolith["total"]}})["total"],
+                                "endpoints": diff(network, monolith)},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Load benchmark for gateway + users + orders.
+
+    python -m benchmarks.run --users 200 --orders-per-user 50 --concurrency 32 --duration 30
+
+Boots the three services as local uvicorn processes on temporary SQLite
+databases, seeds them, drives a weighted mix of endpoints through the gateway
+and prints a JSON report (RPS and p50/p95/p99 per endpoint). If a baseline
+report exists it is compared against it and the exit code is 1 on regression.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import shutil
+import sys
+from pathlib import Path
+
+from .harness import make_stack
+from .seed import seed
+from .stats import build_report, compare
+from .workload import parse_mix, run_workload
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--orders-per-user", type=int, default=50)
+    p.add_argument("--max-items", type=int, default=30, help="max items per seeded order")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=3.0, help="seconds before measuring starts")
+    p.add_argument("--mix", default=None, help='weights override, e.g. "GET /v1/orders=50,POST /v1/users/login=0"')
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--output", default=None, help="write the JSON report here (stdout otherwise)")
+    p.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    p.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression, 0.15 == 15%%")
+    p.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    p.add_argument("--workdir", default=None, help="keep databases and service logs in this directory")
+    p.add_argument("--mode", choices=["network", "monolith"], default="network",
+                   help="separate service processes, or services hosted in the gateway process")
+    return p.parse_args(argv)
+
+
+def run_once(args: argparse.Namespace, mode: str) -> dict:
+    """Boot a fresh stack in `mode`, seed it, drive the workload and return the report."""
+    mix = parse_mix(args.mix)
+    stack = make_stack(args.workdir, mode=mode)
+    data = seed(
+        stack.users_db_url,
+        stack.orders_db_url,
+        users=args.users,
+        orders_per_user=args.orders_per_user,
+        max_items=args.max_items,
+        seed_value=args.seed,
+    )
+    try:
+        with stack:
+            stats, measured = asyncio.run(run_workload(
+                stack.gateway.url,
+                data,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                mix=mix,
+                seed_value=args.seed,
+            ))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(stack.workdir, ignore_errors=True)
+
+    return build_report(stats, measured, {
+        "mode": mode,
+        "users": args.users,
+        "orders": data.order_count,
+        "max_items": args.max_items,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    })
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = run_once(args, args.mode)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(text + "\n")
+        print(f"baseline written to {baseline_path}", file=sys.stderr)
+        return 0
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}, skipping comparison", file=sys.stderr)
+        return 0
+
+    regressions = compare(report, json.loads(baseline_path.read_text()), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from common.auth import create_token
+from common.config import settings
+from common.db import make_engine
+from service_users.app.db import Base as UsersBase
+from service_users.app.models import User
+from service_users.app.security import hash_password
+from service_orders.app.db import Base as OrdersBase
+from service_orders.app.models import Order
+
+from .harness import BENCH_JWT_SECRET
+
+SEED_PASSWORD = "password123"
+PRODUCTS = ["bricks", "cement", "paint", "sand", "gravel", "tiles", "nails", "glue", "boards", "pipes"]
+STATUSES = ["created", "in_progress", "completed", "cancelled"]
+
+
+@dataclass
+class SeedUser:
+    id: str
+    email: str
+    roles: list[str]
+    token: str
+    order_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class SeedData:
+    users: list[SeedUser]
+    admin: SeedUser
+
+    @property
+    def order_count(self) -> int:
+        return sum(len(u.order_ids) for u in self.users)
+
+
+def _items(rng: random.Random, max_items: int) -> list[dict]:
+    return [
+        {"product": rng.choice(PRODUCTS), "quantity": rng.randint(1, 20)}
+        for _ in range(rng.randint(1, max_items))
+    ]
+
+
+def seed(
+    users_db_url: str,
+    orders_db_url: str,
+    *,
+    users: int,
+    orders_per_user: int,
+    max_items: int,
+    seed_value: int = 42,
+    batch_size: int = 5000,
+) -> SeedData:
+    """Bulk-insert users and orders straight into the service databases.
+
+    Going through the API would spend most of the setup in bcrypt, so a
+    single password hash is shared by every seeded user and tokens are minted
+    locally with the benchmark JWT secret.
+    """
+    rng = random.Random(seed_value)
+    password_hash = hash_password(SEED_PASSWORD)
+    now = datetime.utcnow()
+
+    users_engine = make_engine(users_db_url)
+    orders_engine = make_engine(orders_db_url)
+    UsersBase.metadata.create_all(bind=users_engine)
+    OrdersBase.metadata.create_all(bind=orders_engine)
+
+    def token_for(user_id: str, roles: list[str]) -> str:
+        return create_token(
+            user_id=user_id,
+            roles=roles,
+            secret=BENCH_JWT_SECRET,
+            issuer=settings.jwt_issuer,
+            audience=settings.jwt_audience,
+            exp_minutes=24 * 60,
+        )
+
+    seeded: list[SeedUser] = []
+    user_rows: list[dict] = []
+    for i in range(users + 1):
+        roles = ["user", "admin"] if i == users else ["user"]
+        user_id = str(uuid.uuid4())
+        email = f"bench{i}@example.com"
+        user_rows.append({
+            "id": user_id,
+            "email": email,
+            "password_hash": password_hash,
+            "name": f"Bench User {i}",
+            "roles": ",".join(roles),
+            "created_at": now,
+            "updated_at": now,
+        })
+        seeded.append(SeedUser(id=user_id, email=email, roles=roles, token=token_for(user_id, roles)))
+
+    with users_engine.begin() as conn:
+        for start in range(0, len(user_rows), batch_size):
+            conn.execute(insert(User), user_rows[start:start + batch_size])
+
+    admin = seeded.pop()
+    order_rows: list[dict] = []
+    with orders_engine.begin() as conn:
+        for user in seeded:
+            for _ in range(orders_per_user):
+                order_id = str(uuid.uuid4())
+                created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+                items = _items(rng, max_items)
+                order_rows.append({
+                    "id": order_id,
+                    "user_id": user.id,
+                    "items_json": json.dumps(items),
+                    "status": rng.choice(STATUSES),
+                    "total_sum": float(sum(i["quantity"] for i in items) * rng.randint(5, 50)),
+                    "created_at": created,
+                    "updated_at": created,
+                })
+                user.order_ids.append(order_id)
+                if len(order_rows) >= batch_size:
+                    conn.execute(insert(Order), order_rows)
+                    order_rows.clear()
+        if order_rows:
+            conn.execute(insert(Order), order_rows)
+
+    users_engine.dispose()
+    orders_engine.dispose()
+    return SeedData(users=seeded, admin=admin)
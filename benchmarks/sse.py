@@ -0,0 +1,165 @@
+"""Order event push (SSE) capacity of one worker.
+
+    python -m benchmarks.sse --connections 1000 --events 500
+
+Opens N concurrent `GET /v1/orders/events` streams (through the gateway by
+default), then fires status updates for the subscribed users' orders and
+measures publish-to-receive latency. Reports connect time, delivered vs
+expected frames, latency percentiles and the resident memory of each
+service process before and after the connections were opened, once with the
+gateway compressing the streams and once without (`--compression`).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from .harness import ServiceProcess, make_stack
+from .seed import SeedUser, seed
+from .stats import percentile
+
+
+# gateway settings per --compression variant; streams accept the client's default encodings
+COMPRESSION_ENV = {
+    "off": {"COMPRESSION_ENCODINGS": "none"},
+    "on": {"COMPRESSION_CONTENT_TYPES": "text/event-stream"},
+}
+
+
+def rss_kb(svc: ServiceProcess) -> int:
+    for line in Path(f"/proc/{svc.proc.pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+    return 0
+
+
+async def drive(base_url: str, target_url: str, users: list[SeedUser], stack, args) -> dict:
+    rng = random.Random(args.seed)
+    subscribers = [users[i % len(users)] for i in range(args.connections)]
+    per_user = Counter(u.id for u in subscribers)
+    latencies: list[float] = []
+    connected = 0
+    all_connected = asyncio.Event()
+
+    processes = [stack.gateway, *stack.services]
+    rss_before = {svc.name: rss_kb(svc) for svc in processes}
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=0)
+    timeout = httpx.Timeout(30.0, read=None)
+
+    async def listen(client: httpx.AsyncClient, user: SeedUser) -> None:
+        nonlocal connected
+        async with client.stream("GET", f"{target_url}/v1/orders/events",
+                                 headers={"Authorization": f"Bearer {user.token}"}) as r:
+            async for line in r.aiter_lines():
+                if line.startswith("retry:"):
+                    connected += 1
+                    if connected == args.connections:
+                        all_connected.set()
+                elif line.startswith("data: "):
+                    frame = json.loads(line[len("data: "):])
+                    latencies.append((time.time() - frame["ts"]) * 1000.0)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as streams, \
+            httpx.AsyncClient(base_url=base_url, timeout=30.0) as api:
+        started = time.perf_counter()
+        listeners = [asyncio.create_task(listen(streams, u)) for u in subscribers]
+        await asyncio.wait_for(all_connected.wait(), timeout=args.connect_timeout)
+        connect_s = time.perf_counter() - started
+        rss_after = {svc.name: rss_kb(svc) for svc in processes}
+
+        expected = 0
+        subscribed = [u for u in users if per_user[u.id]]
+        started = time.perf_counter()
+        for _ in range(args.events):
+            user = rng.choice(subscribed)
+            r = await api.patch(f"/v1/orders/{rng.choice(user.order_ids)}/status",
+                                json={"status": rng.choice(["created", "in_progress", "completed"])},
+                                headers={"Authorization": f"Bearer {user.token}"})
+            if r.status_code == 200:
+                expected += per_user[user.id]
+            if args.rate:
+                await asyncio.sleep(1.0 / args.rate)
+        publish_s = time.perf_counter() - started
+
+        deadline = time.monotonic() + args.drain
+        while len(latencies) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    values = sorted(latencies)
+    return {
+        "connections": args.connections,
+        "via": args.via,
+        "connect_s": round(connect_s, 3),
+        "events_published": args.events,
+        "publish_s": round(publish_s, 3),
+        "frames_expected": expected,
+        "frames_delivered": len(values),
+        "latency_ms": {
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+        },
+        "rss_kb": {
+            name: {
+                "before": rss_before[name],
+                "after": rss_after[name],
+                "per_connection": round((rss_after[name] - rss_before[name]) / args.connections, 2),
+            }
+            for name in rss_before
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.sse", description=__doc__.splitlines()[0])
+    p.add_argument("--connections", type=int, default=500)
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--events", type=int, default=200, help="status updates to publish")
+    p.add_argument("--rate", type=float, default=0.0, help="status updates per second, 0 == as fast as possible")
+    p.add_argument("--via", choices=["gateway", "orders"], default="gateway",
+                   help="subscribe through the gateway proxy or directly on service_orders")
+    p.add_argument("--mode", choices=["network", "monolith"], default="network")
+    p.add_argument("--connect-timeout", type=float, default=60.0)
+    p.add_argument("--drain", type=float, default=10.0, help="seconds to wait for outstanding frames")
+    p.add_argument("--compression", choices=["both", "on", "off"], default="both",
+                   help="gateway compression of the event streams")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--workdir", default=None)
+    args = p.parse_args(argv)
+    if args.mode == "monolith" and args.via == "orders":
+        p.error("--via orders needs --mode network")
+
+    reports = {}
+    for variant in (["off", "on"] if args.compression == "both" else [args.compression]):
+        workdir = str(Path(args.workdir) / variant) if args.workdir else None
+        stack = make_stack(workdir, extra_env=COMPRESSION_ENV[variant], mode=args.mode)
+        data = seed(stack.users_db_url, stack.orders_db_url, users=args.users, orders_per_user=5, max_items=5,
+                    seed_value=args.seed)
+        try:
+            with stack:
+                target = stack.gateway.url if args.via == "gateway" else stack.services[1].url
+                reports[f"compression_{variant}"] = asyncio.run(drive(stack.gateway.url, target, data.users, stack, args))
+        finally:
+            if args.workdir is None:
+                shutil.rmtree(stack.workdir, ignore_errors=True)
+
+    print(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Cold start measurements for the three apps.
+
+    python -m benchmarks.startup --runs 5
+
+Every run is a fresh interpreter that imports `<service>.app.main`, builds a
+second app with `create_app()` and enters its lifespan (what a worker does
+after fork). Prints median milliseconds per phase as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from .harness import ROOT
+
+SERVICES = {
+    "api_gateway": "api_gateway.app.main",
+    "service_users": "service_users.app.main",
+    "service_orders": "service_orders.app.main",
+}
+
+PROBE = """
+import asyncio, importlib, json, sys, time
+t0 = time.perf_counter()
+main = importlib.import_module(sys.argv[1])
+t1 = time.perf_counter()
+app = main.create_app()
+t2 = time.perf_counter()
+async def enter():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+t3 = asyncio.run(enter())
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000, "lifespan_ms": (t3 - t2) * 1000}))
+"""
+
+
+def measure(module: str, env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, module],
+        cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, check=True,
+    ).stdout
+    # the last line is ours, anything before it is app logging
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__.splitlines()[0])
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args(argv)
+
+    report: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="microbench-startup-") as wd:
+        db_url = f"sqlite:///{Path(wd) / 'startup.db'}"
+        env = {"DATABASE_URL": db_url}
+        for migrate in ("service_users.app.migrate", "service_orders.app.migrate"):
+            subprocess.run([sys.executable, "-m", migrate], cwd=ROOT, env={**os.environ, **env}, check=True)
+        for name, module in SERVICES.items():
+            runs = [measure(module, env) for _ in range(args.runs)]
+            report[name] = {
+                key: round(statistics.median(r[key] for r in runs), 2)
+                for key in ("import_ms", "create_app_ms", "lifespan_ms")
+            }
+    print(json.dumps({"runs": args.runs, "services": report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class EndpointStats:
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        self.latencies_ms.append(latency_ms)
+        if not ok:
+            self.errors += 1
+
+    def summary(self, duration_s: float) -> dict:
+        values = sorted(self.latencies_ms)
+        count = len(values)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "rps": round(count / duration_s, 2) if duration_s > 0 else 0.0,
+            "mean_ms": round(sum(values) / count, 3) if count else 0.0,
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+        }
+
+
+def build_report(stats: dict[str, EndpointStats], duration_s: float, meta: dict) -> dict:
+    total = EndpointStats()
+    for s in stats.values():
+        total.latencies_ms.extend(s.latencies_ms)
+        total.errors += s.errors
+    return {
+        "meta": {**meta, "duration_s": round(duration_s, 3)},
+        "endpoints": {name: s.summary(duration_s) for name, s in sorted(stats.items())},
+        "total": total.summary(duration_s),
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return human readable regressions of `report` against `baseline`.
+
+    An endpoint regresses when its RPS drops, or its p95/p99 grows, by more
+    than `threshold` (0.1 == 10%) relative to the baseline run.
+    """
+    regressions: list[str] = []
+    for name, base in baseline.get("endpoints", {}).items():
+        cur = report.get("endpoints", {}).get(name)
+        if cur is None:
+            regressions.append(f"{name}: missing from current run")
+            continue
+        if base["rps"] > 0 and cur["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {cur['rps']} < baseline {base['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] > 0 and cur[key] > base[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {cur[key]} > baseline {base[key]}")
+        if cur["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {cur['errors']} > baseline {base['errors']}")
+    return regressions
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import httpx
+
+from .seed import SEED_PASSWORD, STATUSES, PRODUCTS, SeedData, SeedUser
+from .stats import EndpointStats
+
+
+@dataclass
+class Op:
+    name: str
+    weight: int
+    run: Callable[[httpx.AsyncClient, SeedData, SeedUser, random.Random], Awaitable[httpx.Response]]
+
+
+def _auth(user: SeedUser) -> dict:
+    return {"Authorization": f"Bearer {user.token}"}
+
+
+async def _me(c, data, user, rng):
+    return await c.get("/v1/users/me", headers=_auth(user))
+
+
+async def _update_me(c, data, user, rng):
+    return await c.put("/v1/users/me", json={"name": f"Bench {rng.randint(0, 10**6)}"}, headers=_auth(user))
+
+
+async def _login(c, data, user, rng):
+    return await c.post("/v1/users/login", json={"email": user.email, "password": SEED_PASSWORD})
+
+
+async def _list_users(c, data, user, rng):
+    return await c.get(f"/v1/users?page={rng.randint(1, 5)}&page_size=20&email=bench{rng.randint(0, 9)}",
+                       headers=_auth(data.admin))
+
+
+async def _list_orders(c, data, user, rng):
+    return await c.get(f"/v1/orders?page={rng.randint(1, 3)}&page_size=20", headers=_auth(user))
+
+
+async def _get_order(c, data, user, rng):
+    return await c.get(f"/v1/orders/{rng.choice(user.order_ids)}", headers=_auth(user))
+
+
+async def _create_order(c, data, user, rng):
+    items = [{"product": rng.choice(PRODUCTS), "quantity": rng.randint(1, 10)} for _ in range(rng.randint(1, 10))]
+    r = await c.post("/v1/orders", json={"items": items, "total_sum": float(rng.randint(10, 1000))}, headers=_auth(user))
+    if r.status_code == 200:
+        user.order_ids.append(r.json()["data"]["id"])
+    return r
+
+
+async def _dashboard(c, data, user, rng):
+    return await c.get("/v1/dashboard", headers=_auth(user))
+
+
+async def _update_status(c, data, user, rng):
+    return await c.patch(f"/v1/orders/{rng.choice(user.order_ids)}/status",
+                         json={"status": rng.choice(STATUSES)}, headers=_auth(user))
+
+
+async def _cancel_order(c, data, user, rng):
+    return await c.post(f"/v1/orders/{rng.choice(user.order_ids)}/cancel", headers=_auth(user))
+
+
+OPS: dict[str, Op] = {op.name: op for op in [
+    Op("GET /v1/users/me", 20, _me),
+    Op("PUT /v1/users/me", 3, _update_me),
+    Op("POST /v1/users/login", 2, _login),
+    Op("GET /v1/users", 5, _list_users),
+    Op("GET /v1/orders", 25, _list_orders),
+    Op("GET /v1/orders/{id}", 25, _get_order),
+    Op("POST /v1/orders", 10, _create_order),
+    Op("GET /v1/dashboard", 10, _dashboard),
+    Op("PATCH /v1/orders/{id}/status", 8, _update_status),
+    Op("POST /v1/orders/{id}/cancel", 2, _cancel_order),
+]}
+
+
+def parse_mix(spec: str | None) -> dict[str, int]:
+    """`"GET /v1/orders=10,GET /v1/users/me=5"` -> weights; unspecified ops keep their defaults."""
+    weights = {name: op.weight for name, op in OPS.items()}
+    if not spec:
+        return weights
+    for part in spec.split(","):
+        name, _, weight = part.rpartition("=")
+        name = name.strip()
+        if name not in OPS:
+            raise ValueError(f"Unknown operation {name!r}, expected one of {sorted(OPS)}")
+        weights[name] = int(weight)
+    return weights
+
+
+async def run_workload(
+    base_url: str,
+    data: SeedData,
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    mix: dict[str, int] | None = None,
+    seed_value: int = 1,
+) -> tuple[dict[str, EndpointStats], float]:
+    weights = mix or {name: op.weight for name, op in OPS.items()}
+    names = [n for n, w in weights.items() if w > 0]
+    ops = [OPS[n] for n in names]
+    op_weights = [weights[n] for n in names]
+    users = [u for u in data.users if u.order_ids]
+
+    stats: dict[str, EndpointStats] = {n: EndpointStats() for n in names}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        loop_start = time.perf_counter()
+        measure_from = loop_start + warmup
+        stop_at = measure_from + duration
+
+        async def worker(worker_id: int) -> None:
+            rng = random.Random(seed_value * 1000 + worker_id)
+            while True:
+                started = time.perf_counter()
+                if started >= stop_at:
+                    return
+                op = rng.choices(ops, weights=op_weights)[0]
+                user = rng.choice(users)
+                try:
+                    resp = await op.run(client, data, user, rng)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if started >= measure_from:
+                    stats[op.name].record((time.perf_counter() - started) * 1000.0, ok)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        measured = time.perf_counter() - measure_from
+
+    return stats, measured
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import httpx
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+def make_async_client(
+    base_url: str,
+    *,
+    timeout: float,
+    transport: httpx.AsyncBaseTransport | None = None,
+    max_connections: int | None = 100,
+    max_keepalive_connections: int | None = None,
+) -> httpx.AsyncClient:
+    """Pooled, traced client for service-to-service calls.
+
+    Create it in the app lifespan (after fork) and close it on shutdown;
+    keep-alive connections are reused across requests.
+    """
+    client = httpx.AsyncClient(
+        base_url=base_url,
+        timeout=timeout,
+        transport=transport,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections if max_keepalive_connections is not None else max_connections,
+        ),
+    )
+    HTTPXClientInstrumentor.instrument_client(client)
+    return client
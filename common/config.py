@@ -18,17 +18,56 @@ class Settings(BaseSettings):
     # tracing
     otel_exporter_otlp_endpoint: str | None = None  # e.g. http://jaeger:4318
     otel_service_namespace: str = "micro-task"
+    # metrics (e.g. gateway compression) go to an OTLP collector; Jaeger only takes traces
+    otel_exporter_otlp_metrics_endpoint: str | None = None  # e.g. http://otel-collector:4318
 
     # DB
     database_url: str = "sqlite:///./app.db"
+    # service_orders only: "s0=<url>,s1=<url>,..." spreads orders over shards by user_id
+    # (consistent hashing); empty keeps everything in database_url
+    orders_shard_urls: str = ""
+    orders_shard_vnodes: int = 64
+    # service_orders: completed/cancelled orders untouched for archive_after_days move to
+    # orders_archive in batches, archive_batch_pause seconds apart; the in-process archiver
+    # runs every archive_interval_seconds (0 = off, run `python -m app.archive` instead)
+    archive_after_days: float = 30.0
+    archive_batch_size: int = 500
+    archive_batch_pause: float = 0.5
+    archive_interval_seconds: float = 0.0
 
     # gateway upstreams
     users_service_url: str = "http://service_users:8001"
     orders_service_url: str = "http://service_orders:8002"
+    # "network": proxy to the upstream URLs above; "monolith": host service_users and
+    # service_orders in the gateway process and dispatch to them over ASGI
+    gateway_mode: str = "network"
+    # per-section upstream budget of GET /v1/dashboard; a slow section is reported, not awaited
+    dashboard_section_timeout: float = 5.0
+    # gateway response compression: encodings in server preference order (br/zstd need the
+    # Brotli/zstandard packages), content types matched by prefix, smaller bodies are sent as is.
+    # text/event-stream is left out: every open SSE connection would hold its own compressor
+    compression_encodings: str = "zstd,br,gzip"
+    compression_content_types: str = "application/json,application/x-ndjson,text/plain,text/html,text/css,text/csv"
+    compression_min_size: int = 1024
 
     # rate limit
     rate_limit: str = "60/minute"  # default for gateway
 
     disable_user_check: bool = False
 
+    # on-demand profiling (common/profiling.py): an admin request with `X-Profile: 1`, or this
+    # fraction of all requests, is sampled and saved as <profile_dir>/<request id>.<service>.folded
+    profile_dir: str = "./profiles"
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 2.0
+    profile_max_seconds: float = 30.0
+    # only the newest profiles per service are kept in profile_dir
+    profile_keep_files: int = 200
+    # SQL statements slower than this are logged with parameter types and query plan; 0 = off
+    slow_query_ms: float = 200.0
+
+    # order status push (SSE)
+    sse_heartbeat_seconds: float = 15.0  # keep below the gateway's upstream read timeout (30s)
+    sse_queue_size: int = 100  # per subscriber; oldest frames are dropped when a client lags
+
 settings = Settings()
@@ -0,0 +1,59 @@
+"""Engine and session plumbing shared by the services; each keeps its own `Base`."""
+import threading
+
+import sqlalchemy
+from sqlalchemy.orm import sessionmaker, Session
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+from .slowlog import log_slow_queries
+
+def make_engine(database_url: str, slow_query_ms: float = 0.0):
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    # looked up at call time so engines pick up SQLAlchemyInstrumentor's create_engine wrapper
+    engine = sqlalchemy.create_engine(database_url, future=True, echo=False, connect_args=connect_args)
+    log_slow_queries(engine, slow_query_ms)
+    return engine
+
+def make_session_factory(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+
+class Database:
+    """Engine and session factory created on first use.
+
+    Nothing is opened at import or app construction time, so the app module
+    can be preloaded by a forking server and every worker gets its own pool.
+    """
+    def __init__(self, database_url: str, slow_query_ms: float = 0.0):
+        self.database_url = database_url
+        self.slow_query_ms = slow_query_ms
+        self._engine = None
+        self._session_factory = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = make_engine(self.database_url, self.slow_query_ms)
+                    self._session_factory = make_session_factory(engine)
+                    self._engine = engine
+        return self._engine
+
+    def session(self) -> Session:
+        if self._session_factory is None:
+            self.engine  # creates the session factory as well
+        return self._session_factory()
+
+    def dispose(self) -> None:
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+            self._engine = None
+            self._session_factory = None
+
+def instrument_sqlalchemy() -> None:
+    # wraps sqlalchemy.create_engine once per process; engines created afterwards are traced
+    instrumentor = SQLAlchemyInstrumentor()
+    if not instrumentor.is_instrumented_by_opentelemetry:
+        instrumentor.instrument()
@@ -4,11 +4,18 @@ from starlette.responses import Response
 
 REQUEST_ID_HEADER = "X-Request-ID"
 
-def get_or_create_request_id(request: Request) -> str:
-    rid = request.headers.get(REQUEST_ID_HEADER)
+def request_id_from(headers) -> str:
+    rid = headers.get(REQUEST_ID_HEADER)
     if rid and len(rid) <= 128:
         return rid
     return str(uuid.uuid4())
 
+def get_or_create_request_id(request: Request) -> str:
+    # kept on the request state, so middleware and handlers agree on a generated id
+    rid = getattr(request.state, "request_id", None)
+    if rid is None:
+        rid = request.state.request_id = request_id_from(request.headers)
+    return rid
+
 def set_request_id(response: Response, request_id: str) -> None:
     response.headers[REQUEST_ID_HEADER] = request_id
@@ -0,0 +1,168 @@
+"""On-demand statistical profiling of single requests.
+
+A request is profiled when an admin sends `X-Profile: 1` (the header is
+forwarded by the gateway, so every service on the path profiles its part) or
+when it falls into PROFILE_SAMPLE_RATE. Sampling is decided per hop: a sampled
+gateway request is not sampled downstream, use the header to follow one
+request through every service. While it runs, a sampler thread
+records the Python stacks of the worker's busy threads every
+PROFILE_INTERVAL_MS; the counts are written in the folded format read by
+flamegraph.pl, inferno and speedscope to
+
+    <PROFILE_DIR>/<X-Request-ID>.<service>.folded
+
+Only the newest PROFILE_KEEP_FILES profiles of each service are kept.
+Samples cover the whole worker process, so requests served concurrently by
+the same worker show up as well.
+"""
+from __future__ import annotations
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from .auth import decode_token, JwtError
+from .config import Settings
+from .http import request_id_from
+from .logging import get_logger
+
+log = get_logger("profiling")
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# leaf frames of threads that are parked rather than working (event loop, pool workers, exporters)
+IDLE_LEAVES = {("threading.py", "wait"), ("selectors.py", "select")}
+
+# one profile at a time per process; other requests run unprofiled meanwhile
+_active = threading.Lock()
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def fold(frame) -> str | None:
+    """`root;...;leaf` for a thread's current frame, None when the thread is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+class StackSampler(threading.Thread):
+    def __init__(self, interval: float, max_seconds: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.counts: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        try:
+            while not self._done.wait(self.interval) and time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == self.ident:
+                        continue
+                    stack = fold(frame)
+                    if stack is not None:
+                        self.counts[f"{names.get(ident, ident)};{stack}"] += 1
+        finally:
+            # a long-lived stream stops being sampled at the deadline and frees the slot
+            _active.release()
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.counts
+
+def profile_path(profile_dir: str, request_id: str, service_name: str) -> Path:
+    # the request id comes from the client: keep it a single plain file name
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", request_id)
+    return Path(profile_dir) / f"{safe_id}.{service_name}.folded"
+
+def write_profile(path: Path, counts: Counter) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{stack} {n}\n" for stack, n in counts.most_common()))
+
+def prune_profiles(profile_dir: Path, service_name: str, keep_files: int) -> None:
+    """Delete all but the newest `keep_files` profiles of `service_name`."""
+    def mtime(p: Path) -> float:
+        try:
+            return p.stat().st_mtime
+        except FileNotFoundError:  # removed by another worker meanwhile
+            return 0.0
+    profiles = sorted(profile_dir.glob(f"*.{service_name}.folded"), key=mtime, reverse=True)
+    for old in profiles[keep_files:]:
+        old.unlink(missing_ok=True)
+
+def is_admin_request(headers: Headers, settings: Settings) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_token(token=token, secret=settings.jwt_secret, issuer=settings.jwt_issuer,
+                               audience=settings.jwt_audience)
+    except JwtError:
+        return False
+    return "admin" in payload.get("roles", [])
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: requests that are not profiled pass straight through."""
+    def __init__(self, app, service_name: str, settings: Settings):
+        self.app = app
+        self.service_name = service_name
+        self.settings = settings
+
+    def wants_profile(self, headers: Headers) -> bool:
+        if headers.get(PROFILE_HEADER) == "1" and is_admin_request(headers, self.settings):
+            return True
+        rate = self.settings.profile_sample_rate
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        if not self.wants_profile(headers) or not _active.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+        # released by the sampler thread when it stops
+
+        request_id = request_id_from(headers)
+        # picked up by get_or_create_request_id, so the proxied request carries the same id
+        scope.setdefault("state", {})["request_id"] = request_id
+        path = profile_path(self.settings.profile_dir, request_id, self.service_name)
+        sampler = StackSampler(self.settings.profile_interval_ms / 1000.0, self.settings.profile_max_seconds)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = path.name
+            await send(message)
+
+        sampler.start()
+        try:
+            # returns once the body is sent, streamed ones (export, SSE) included
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            counts = await run_in_threadpool(sampler.stop)
+            try:
+                await run_in_threadpool(write_profile, path, counts)
+                await run_in_threadpool(prune_profiles, path.parent, self.service_name, self.settings.profile_keep_files)
+            except OSError as e:
+                log.warning("cannot write profile %s: %s", path, e)
+            else:
+                log.info("profiled %s %s in %.1f ms: %d samples -> %s", scope["method"], scope["path"],
+                         (time.perf_counter() - started) * 1000, sum(counts.values()), path)
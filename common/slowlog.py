@@ -0,0 +1,61 @@
+"""Logs SQL statements slower than SLOW_QUERY_MS with the shape of their
+parameters (types, never values) and the database's plan for SELECTs."""
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .logging import get_logger
+
+log = get_logger("slow_query")
+
+EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {parameters_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in parameters or ()) + ")"
+
+def explain(cursor, dialect: str, statement: str, parameters) -> str | None:
+    prefix = EXPLAIN_PREFIX.get(dialect)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    # a fresh cursor: the original one may still hold unread rows
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(prefix + statement, parameters)
+        return " | ".join(" ".join(str(col) for col in row) for row in plan_cursor.fetchall())
+    except Exception as e:  # the plan is a diagnostic, never fail the query over it
+        return f"unavailable ({e})"
+    finally:
+        plan_cursor.close()
+
+def log_slow_queries(engine: Engine, threshold_ms: float) -> None:
+    """Time every statement of `engine`; no-op when `threshold_ms` <= 0."""
+    if threshold_ms <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        # a statement that raised never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        if elapsed_ms < threshold_ms:
+            return
+        plan = None if executemany else explain(cursor, engine.dialect.name, statement, parameters)
+        log.warning("slow query %.1f ms: %s params=%s plan=%s", elapsed_ms, " ".join(statement.split()),
+                    parameters_shape(parameters, executemany), plan)
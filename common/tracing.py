@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from typing import Optional
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
 
-def setup_tracing(service_name: str, namespace: str, otlp_endpoint: str | None) -> None:
+def setup_tracing(service_name: str, namespace: str, otlp_endpoint: str | None) -> TracerProvider:
+    # BatchSpanProcessor owns an exporter thread, so call this after fork (in the app lifespan)
     resource = Resource.create({
         "service.name": service_name,
         "service.namespace": namespace,
@@ -19,3 +23,17 @@ def setup_tracing(service_name: str, namespace: str, otlp_endpoint: str | None)
     else:
         provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
     trace.set_tracer_provider(provider)
+    return provider
+
+def setup_metrics(service_name: str, namespace: str, otlp_endpoint: str | None) -> MeterProvider | None:
+    # instruments stay no-ops without an endpoint; the reader thread starts here, i.e. after fork
+    if not otlp_endpoint:
+        return None
+    resource = Resource.create({
+        "service.name": service_name,
+        "service.namespace": namespace,
+    })
+    reader = PeriodicExportingMetricReader(OTLPMetricExporter(endpoint=otlp_endpoint.rstrip("/") + "/v1/metrics"))
+    provider = MeterProvider(resource=resource, metric_readers=[reader])
+    metrics.set_meter_provider(provider)
+    return provider
@@ -0,0 +1,126 @@
+"""Moves completed/cancelled orders older than ARCHIVE_AFTER_DAYS from `orders` into `orders_archive`:
+
+    python -m app.archive                          # inside the image, once (e.g. from cron)
+    python -m app.archive --older-than-days 90 --batch-size 1000 --pause 0.2
+
+The same job runs inside the service every ARCHIVE_INTERVAL_SECONDS when that is > 0;
+enable it in one process only (a single replica and worker), the others leave it at 0.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+
+from sqlalchemy import select, insert, delete, and_, func, literal
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from common.config import Settings, settings as default_settings
+from common.logging import get_logger
+from .models import Order, OrderArchive, ORDER_COLUMNS, utcnow
+from .shards import ShardSet
+
+log = get_logger("service_orders.archive")
+
+TERMINAL_STATUSES = ("completed", "cancelled")
+
+def _eligible(cutoff):
+    return and_(Order.status.in_(TERMINAL_STATUSES), Order.updated_at < cutoff)
+
+def archive_batch(db: Session, cutoff, batch_size: int) -> tuple[int, int]:
+    """Copy and delete up to `batch_size` eligible orders in one transaction,
+    so an order is never in both tables or in neither. Returns (picked, moved)."""
+    ids = db.scalars(
+        select(Order.id).where(_eligible(cutoff)).order_by(Order.updated_at).limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        return 0, 0
+    # the condition is repeated: an order may have changed since it was picked
+    picked = and_(Order.id.in_(ids), _eligible(cutoff))
+    db.execute(insert(OrderArchive).from_select(
+        [*ORDER_COLUMNS, "archived_at"],
+        select(*(Order.__table__.c[k] for k in ORDER_COLUMNS), literal(utcnow())).where(picked),
+    ))
+    moved = db.execute(delete(Order).where(picked).execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return len(ids), moved
+
+def count_eligible(db: Session, cutoff) -> int:
+    return int(db.scalar(select(func.count()).select_from(Order).where(_eligible(cutoff))) or 0)
+
+def _run_batch(shards: ShardSet, shard: str, cutoff, batch_size: int) -> tuple[int, int]:
+    db = shards.session(shard)
+    try:
+        return archive_batch(db, cutoff, batch_size)
+    finally:
+        db.close()
+
+async def archive_orders(shards: ShardSet, older_than: timedelta, batch_size: int = 500, pause: float = 0.5) -> dict[str, int]:
+    """Archive every shard concurrently; returns orders moved per shard.
+
+    `batch_size` bounds each write transaction, `pause` (seconds) between
+    batches caps the archiver's share of the shard's write throughput.
+    """
+    cutoff = utcnow() - older_than
+
+    async def run(shard: str) -> int:
+        total = 0
+        while True:
+            picked, moved = await run_in_threadpool(_run_batch, shards, shard, cutoff, batch_size)
+            total += moved
+            # orders changed since they were picked are skipped, not a sign the shard is done
+            if picked < batch_size:
+                return total
+            await asyncio.sleep(pause)
+
+    results = await asyncio.gather(*(run(shard) for shard in shards.names))
+    return dict(zip(shards.names, results))
+
+async def run_archiver(shards: ShardSet, settings: Settings) -> None:
+    """Background loop started by the lifespan; cancelled on shutdown."""
+    while True:
+        await asyncio.sleep(settings.archive_interval_seconds)
+        try:
+            moved = await archive_orders(shards, timedelta(days=settings.archive_after_days),
+                                         settings.archive_batch_size, settings.archive_batch_pause)
+        except Exception:
+            log.exception("order archival failed")
+            continue
+        if any(moved.values()):
+            log.info("archived orders %s", moved)
+
+def main(argv: list[str] | None = None) -> int:
+    s = default_settings
+    p = argparse.ArgumentParser(prog="python -m app.archive", description=__doc__.splitlines()[0])
+    p.add_argument("--older-than-days", type=float, default=s.archive_after_days)
+    p.add_argument("--batch-size", type=int, default=s.archive_batch_size)
+    p.add_argument("--pause", type=float, default=s.archive_batch_pause, help="seconds between batches")
+    p.add_argument("--dry-run", action="store_true", help="only count the orders that would move")
+    args = p.parse_args(argv)
+
+    shards = ShardSet.from_settings(s)
+    try:
+        older_than = timedelta(days=args.older_than_days)
+        if args.dry_run:
+            cutoff = utcnow() - older_than
+            moved = {}
+            for name in shards.names:
+                db = shards.session(name)
+                try:
+                    moved[name] = count_eligible(db, cutoff)
+                finally:
+                    db.close()
+        else:
+            moved = asyncio.run(archive_orders(shards, older_than, args.batch_size, args.pause))
+    finally:
+        shards.dispose()
+    for name, count in moved.items():
+        print(f"{name}: {count}")
+    print(f"total: {sum(moved.values())}{' (dry run)' if args.dry_run else ''}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
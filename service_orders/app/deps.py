@@ -1,32 +1,30 @@
 from __future__ import annotations
 from typing import Generator
-from fastapi import Header
+from fastapi import Depends, FastAPI, Header, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import select
+from sqlalchemy.engine import Row
 import httpx
 
-from common.config import settings
+from common.config import Settings
 from common.auth import get_bearer_token, decode_token, JwtError
+from common.clients import make_async_client
 from common.responses import fail
-from .db import make_engine, make_session_factory
 from .models import Order
+from .shards import ShardSet
 
-engine = make_engine(settings.database_url)
-SessionLocal = make_session_factory(engine)
-
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
 
 class AuthUser:
     def __init__(self, user_id: str, roles: list[str]):
         self.user_id = user_id
         self.roles = roles
 
-def get_current_user(authorization: str | None = Header(default=None)) -> AuthUser:
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    settings: Settings = Depends(get_settings),
+) -> AuthUser:
     token = get_bearer_token(authorization)
     if not token:
         raise fail("UNAUTHORIZED", "Missing bearer token", 401)
@@ -41,16 +39,75 @@ def get_current_user(authorization: str | None = Header(default=None)) -> AuthUs
     except JwtError:
         raise fail("UNAUTHORIZED", "Invalid token", 401)
 
-async def ensure_user_exists(user_id: str, request_id: str | None = None) -> bool:
-    if settings.disable_user_check:
+def require_admin(user: AuthUser = Depends(get_current_user)) -> AuthUser:
+    if "admin" not in user.roles:
+        raise fail("FORBIDDEN", "Admin role required", 403)
+    return user
+
+def get_users_client(app: FastAPI) -> httpx.AsyncClient:
+    # normally opened by the lifespan; created lazily when the app is driven without it
+    if app.state.users_client is None:
+        app.state.users_client = make_async_client(app.state.settings.users_service_url, timeout=5.0)
+    return app.state.users_client
+
+def get_user_db(request: Request, auth: AuthUser = Depends(get_current_user)) -> Generator[Session, None, None]:
+    """Session on the caller's shard; `db.info["shard"]` names it."""
+    shards: ShardSet = request.app.state.shards
+    shard = shards.shard_for_user(auth.user_id)
+    db = shards.session(shard)
+    db.info["shard"] = shard
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_order_db(request: Request, order_id: str) -> Generator[Session, None, None]:
+    """Session on the home shard of the `order_id` path parameter; `db.info["shard"]` names it."""
+    shards: ShardSet = request.app.state.shards
+    shard = shards.home_shard(order_id)
+    db = shards.session(shard)
+    db.info["shard"] = shard
+    db.info["fallbacks"] = []
+    try:
+        yield db
+    finally:
+        for other in db.info["fallbacks"]:
+            other.close()
+        db.close()
+
+def order_for_update(request: Request, db: Session, order_id: str) -> tuple[Session, Order | None, Row | None]:
+    """(session, order, None) for an order that can be modified, else (db, None, row)
+    where `row` is its archived copy or None when it does not exist.
+
+    One query when the order is on its home shard; misses fall back to the other
+    shards for orders moved by a rebalance.
+    """
+    order = db.scalar(select(Order).where(Order.id == order_id))
+    if order is not None:
+        return db, order, None
+    found = request.app.state.shards.find_order(order_id, db, include_archived=True)
+    if found is None:
+        return db, None, None
+    shard, row = found
+    if row.archived or shard == db.info["shard"]:
+        return db, None, row
+    other = request.app.state.shards.session(shard)
+    other.info["shard"] = shard
+    db.info["fallbacks"].append(other)
+    return other, other.get(Order, order_id), None
+
+async def ensure_user_exists(app: FastAPI, user_id: str, request_id: str | None = None) -> bool:
+    if app.state.settings.disable_user_check:
         return True
+    # in-process lookup installed when service_users runs in the same process (monolith mode)
+    if app.state.user_checker is not None:
+        return await app.state.user_checker(user_id, request_id)
     # Service-to-service check (prepare for future broker, but now direct call)
     headers = {}
     if request_id:
         headers["X-Request-ID"] = request_id
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        r = await client.get(f"{settings.users_service_url}/v1/users/internal/{user_id}", headers=headers)
-        return r.status_code == 200
+    r = await get_users_client(app).get(f"/v1/users/internal/{user_id}", headers=headers)
+    return r.status_code == 200
 
 def can_access_order(auth: AuthUser, order: Order) -> bool:
     if order.user_id == auth.user_id:
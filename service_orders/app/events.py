@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 from common.logging import get_logger
 
 log = get_logger("domain_events")
@@ -12,9 +12,22 @@ class DomainEvent:
 
 class EventPublisher:
     """Заготовка для будущего брокера сообщений.
-    Сейчас просто пишет событие в лог, сохраняя request_id/trace в контексте."
+    Сейчас пишет событие в лог, сохраняя request_id/trace в контексте,
+    и передаёт его локальным подписчикам (например, EventHub для SSE).
     """
+    def __init__(self) -> None:
+        self._listeners: list[Callable[[DomainEvent], None]] = []
+
+    def add_listener(self, listener: Callable[[DomainEvent], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[DomainEvent], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
     def publish(self, event: DomainEvent) -> None:
         log.info(f"event={event.name} payload={event.payload}")
+        for listener in list(self._listeners):
+            listener(event)
 
 publisher = EventPublisher()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from typing import AsyncIterator
+
+from common.logging import get_logger
+from .events import DomainEvent
+
+log = get_logger("order_events_hub")
+
+PUSHED_EVENTS = {"order.status_updated", "order.cancelled"}
+
+class Subscription:
+    def __init__(self, user_id: str, is_admin: bool, order_id: str | None, queue_size: int):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.order_id = order_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def wants(self, payload: dict) -> bool:
+        return self.order_id is None or payload.get("order_id") == self.order_id
+
+class EventHub:
+    """Fans order events out to SSE subscribers of this process.
+
+    Subscribers are indexed by user_id, so an event costs O(subscribers of
+    its owner + admins) rather than O(all connections). Each subscriber owns a
+    bounded queue; a slow client loses its oldest frames instead of growing
+    memory. Fan-out is per process: with several workers, a subscriber only
+    sees events published by its own worker until EventPublisher is backed by
+    a broker.
+    """
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._by_user: dict[str, set[Subscription]] = {}
+        self._admins: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ids = itertools.count(1)
+
+    def bind(self, loop: asyncio.AbstractEventLoop | None) -> None:
+        self._loop = loop
+
+    @property
+    def connections(self) -> int:
+        return len(self._admins) + sum(len(s) for s in self._by_user.values())
+
+    def subscribe(self, user_id: str, is_admin: bool, order_id: str | None = None) -> Subscription:
+        sub = Subscription(user_id, is_admin, order_id, self.queue_size)
+        if is_admin:
+            self._admins.add(sub)
+        else:
+            self._by_user.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub.is_admin:
+            self._admins.discard(sub)
+            return
+        subs = self._by_user.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._by_user[sub.user_id]
+
+    def publish(self, event: DomainEvent) -> None:
+        # called from sync handlers in the threadpool as well as from the loop
+        if event.name not in PUSHED_EVENTS or self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: DomainEvent) -> None:
+        targets = itertools.chain(self._by_user.get(event.payload.get("user_id"), ()), self._admins)
+        frame = None
+        for sub in targets:
+            if not sub.wants(event.payload):
+                continue
+            if frame is None:
+                data = json.dumps({"event": event.name, "payload": event.payload, "ts": time.time()})
+                frame = f"id: {next(self._ids)}\nevent: {event.name}\ndata: {data}\n\n"
+            if sub.queue.full():
+                sub.queue.get_nowait()
+                sub.dropped += 1
+            sub.queue.put_nowait(frame)
+
+    async def stream(self, user_id: str, is_admin: bool, order_id: str | None, heartbeat: float) -> AsyncIterator[str]:
+        # subscribing on first iteration ties the subscription's lifetime to the response body
+        sub = self.subscribe(user_id, is_admin, order_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # keeps proxies and the gateway's read timeout from closing an idle stream
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(sub)
+            if sub.dropped:
+                log.info(f"subscriber user_id={sub.user_id} dropped {sub.dropped} events")
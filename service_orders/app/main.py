@@ -1,54 +1,49 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from fastapi import FastAPI, Depends, Query, Path
+import time
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, APIRouter, Depends, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select, func, desc, asc
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
 
-from common.config import settings
+from common.config import Settings, settings as default_settings
 from common.responses import ok, fail
 from common.logging import setup_logging, get_logger
 from common.tracing import setup_tracing
+from common.profiling import ProfilingMiddleware
 
-from .db import Base
-from .deps import engine, get_db, get_current_user, ensure_user_exists, can_access_order, AuthUser
-from .models import Order
+from common.db import instrument_sqlalchemy
+from .deps import (
+    get_user_db, get_order_db, get_current_user, require_admin, get_users_client,
+    ensure_user_exists, can_access_order, order_for_update, AuthUser,
+)
+from .models import Order, orders_view, order_to_public
 from .schemas import CreateOrderRequest, UpdateStatusRequest
 from .events import publisher, DomainEvent
+from .hub import EventHub
+from .scatter import list_all_orders, export_orders
+from .archive import run_archiver
+from .shards import ShardSet
 
-setup_logging("service_orders")
-setup_tracing("service_orders", settings.otel_service_namespace, settings.otel_exporter_otlp_endpoint)
-
-Base.metadata.create_all(bind=engine)
-SQLAlchemyInstrumentor().instrument(engine=engine)
-HTTPXClientInstrumentor().instrument()
-
-app = FastAPI(title="Service Orders", version="1.0.0", openapi_url="/openapi.json")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[o.strip() for o in settings.cors_allow_origins.split(",")] if settings.cors_allow_origins != "*" else ["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-FastAPIInstrumentor.instrument_app(app)
 log = get_logger("service_orders")
+router = APIRouter()
 
 VALID_STATUSES = {"created", "in_progress", "completed", "cancelled"}
 
-@app.post("/v1/orders")
-async def create_order(payload: CreateOrderRequest, auth: AuthUser = Depends(get_current_user), db=Depends(get_db)):
+@router.post("/v1/orders")
+async def create_order(request: Request, payload: CreateOrderRequest, auth: AuthUser = Depends(get_current_user), db=Depends(get_user_db)):
     request_id = None  # gateway forwards X-Request-ID; optional to pass here
-    exists = await ensure_user_exists(auth.user_id, request_id=request_id)
+    exists = await ensure_user_exists(request.app, auth.user_id, request_id=request_id)
     if not exists:
         return fail("USER_NOT_FOUND", "User does not exist", 400)
 
     order = Order(
+        id=request.app.state.shards.new_order_id(db.info["shard"]),
         user_id=auth.user_id,
         items_json=json.dumps([i.model_dump() for i in payload.items]),
         status="created",
@@ -61,41 +56,92 @@ async def create_order(payload: CreateOrderRequest, auth: AuthUser = Depends(get
     publisher.publish(DomainEvent(name="order.created", payload={"order_id": order.id, "user_id": auth.user_id}))
     return ok(order.to_public())
 
-@app.get("/v1/orders/{order_id}")
-def get_order(order_id: str = Path(...), auth: AuthUser = Depends(get_current_user), db=Depends(get_db)):
-    order = db.scalar(select(Order).where(Order.id == order_id))
-    if not order:
+@router.get("/v1/orders/events")
+async def subscribe_order_events(
+    request: Request,
+    order_id: str | None = Query(default=None),
+    auth: AuthUser = Depends(get_current_user),
+):
+    """Server-sent `order.status_updated` / `order.cancelled` events for the
+    caller's orders (all orders for admins), optionally for one `order_id`."""
+    hub: EventHub = request.app.state.hub
+    return StreamingResponse(
+        hub.stream(auth.user_id, "admin" in auth.roles, order_id, request.app.state.settings.sse_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/v1/orders/all")
+async def list_all(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    status: str | None = Query(default=None),
+    include_archived: bool = Query(False),
+    _: AuthUser = Depends(require_admin),
+):
+    """Admin: newest orders across all shards, queried concurrently."""
+    return ok(await list_all_orders(request.app.state.shards, page, page_size, status, include_archived))
+
+@router.get("/v1/orders/export")
+async def export_all(request: Request, include_archived: bool = Query(False), _: AuthUser = Depends(require_admin)):
+    """Admin: every order as NDJSON, streamed while the shards are read concurrently."""
+    async def lines():
+        async for order in export_orders(request.app.state.shards, include_archived=include_archived):
+            yield json.dumps(order) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/v1/orders/{order_id}")
+def get_order(
+    request: Request,
+    order_id: str = Path(...),
+    include_archived: bool = Query(False),
+    auth: AuthUser = Depends(get_current_user),
+    db=Depends(get_order_db),
+):
+    found = request.app.state.shards.find_order(order_id, db, include_archived)
+    if not found:
         return fail("NOT_FOUND", "Order not found", 404)
+    _, order = found
     if not can_access_order(auth, order):
         return fail("FORBIDDEN", "Not allowed to access this order", 403)
-    return ok(order.to_public())
+    return ok(order_to_public(order))
 
-@app.get("/v1/orders")
+@router.get("/v1/orders")
 def list_my_orders(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort: str = Query("created_at"),
     order: str = Query("desc"),
+    include_archived: bool = Query(False),
     auth: AuthUser = Depends(get_current_user),
-    db=Depends(get_db),
+    db=Depends(get_user_db),
 ):
-    q = select(Order).where(Order.user_id == auth.user_id)
-    sort_col = getattr(Order, sort, Order.created_at)
+    orders = orders_view(include_archived)
+    q = select(orders).where(orders.c.user_id == auth.user_id)
+    sort_col = orders.c.get(sort, orders.c.created_at)
     q = q.order_by(desc(sort_col) if order.lower() == "desc" else asc(sort_col))
     total = db.scalar(select(func.count()).select_from(q.subquery()))
-    items = db.scalars(q.offset((page-1)*page_size).limit(page_size)).all()
+    items = db.execute(q.offset((page-1)*page_size).limit(page_size)).all()
     return ok({
-        "items": [o.to_public() for o in items],
+        "items": [order_to_public(o) for o in items],
         "page": page,
         "page_size": page_size,
         "total": int(total or 0),
     })
 
-@app.patch("/v1/orders/{order_id}/status")
-def update_status(order_id: str, payload: UpdateStatusRequest, auth: AuthUser = Depends(get_current_user), db=Depends(get_db)):
-    order_obj = db.scalar(select(Order).where(Order.id == order_id))
-    if not order_obj:
+def archived_or_not_found(auth: AuthUser, archived):
+    if archived is None:
         return fail("NOT_FOUND", "Order not found", 404)
+    if not can_access_order(auth, archived):
+        return fail("FORBIDDEN", "Not allowed", 403)
+    return fail("ORDER_ARCHIVED", "Archived orders are read-only", 409)
+
+@router.patch("/v1/orders/{order_id}/status")
+def update_status(request: Request, order_id: str, payload: UpdateStatusRequest, auth: AuthUser = Depends(get_current_user), db=Depends(get_order_db)):
+    db, order_obj, archived = order_for_update(request, db, order_id)
+    if not order_obj:
+        return archived_or_not_found(auth, archived)
     if not can_access_order(auth, order_obj):
         return fail("FORBIDDEN", "Not allowed", 403)
     if payload.status not in VALID_STATUSES:
@@ -104,14 +150,14 @@ def update_status(order_id: str, payload: UpdateStatusRequest, auth: AuthUser =
     db.add(order_obj)
     db.commit()
     db.refresh(order_obj)
-    publisher.publish(DomainEvent(name="order.status_updated", payload={"order_id": order_obj.id, "status": order_obj.status}))
+    publisher.publish(DomainEvent(name="order.status_updated", payload={"order_id": order_obj.id, "user_id": order_obj.user_id, "status": order_obj.status}))
     return ok(order_obj.to_public())
 
-@app.post("/v1/orders/{order_id}/cancel")
-def cancel_order(order_id: str, auth: AuthUser = Depends(get_current_user), db=Depends(get_db)):
-    order_obj = db.scalar(select(Order).where(Order.id == order_id))
+@router.post("/v1/orders/{order_id}/cancel")
+def cancel_order(request: Request, order_id: str, auth: AuthUser = Depends(get_current_user), db=Depends(get_order_db)):
+    db, order_obj, archived = order_for_update(request, db, order_id)
     if not order_obj:
-        return fail("NOT_FOUND", "Order not found", 404)
+        return archived_or_not_found(auth, archived)
     if order_obj.user_id != auth.user_id and "admin" not in auth.roles:
         return fail("FORBIDDEN", "Not allowed to cancel this order", 403)
     if order_obj.status == "cancelled":
@@ -120,5 +166,69 @@ def cancel_order(order_id: str, auth: AuthUser = Depends(get_current_user), db=D
     db.add(order_obj)
     db.commit()
     db.refresh(order_obj)
-    publisher.publish(DomainEvent(name="order.cancelled", payload={"order_id": order_obj.id}))
+    publisher.publish(DomainEvent(name="order.cancelled", payload={"order_id": order_obj.id, "user_id": order_obj.user_id, "status": order_obj.status}))
     return ok(order_obj.to_public())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # runs in every worker after fork: tracing exporter thread, engine and client pools live here
+    started = time.perf_counter()
+    settings: Settings = app.state.settings
+    provider = None
+    if not app.state.embedded:
+        setup_logging("service_orders")
+        provider = setup_tracing("service_orders", settings.otel_service_namespace, settings.otel_exporter_otlp_endpoint)
+    instrument_sqlalchemy()
+    for database in app.state.shards.databases.values():
+        with database.engine.connect():
+            pass
+    if app.state.user_checker is None:
+        get_users_client(app)
+    app.state.hub.bind(asyncio.get_running_loop())
+    publisher.add_listener(app.state.hub.publish)
+    archiver = None
+    if settings.archive_interval_seconds > 0:
+        archiver = asyncio.create_task(run_archiver(app.state.shards, settings))
+    app.state.startup_ms = (time.perf_counter() - started) * 1000
+    log.info("startup completed in %.1f ms", app.state.startup_ms)
+    try:
+        yield
+    finally:
+        if archiver is not None:
+            archiver.cancel()
+            with suppress(asyncio.CancelledError):
+                await archiver
+        publisher.remove_listener(app.state.hub.publish)
+        app.state.hub.bind(None)
+        if app.state.users_client is not None:
+            await app.state.users_client.aclose()
+            app.state.users_client = None
+        app.state.shards.dispose()
+        if provider is not None:
+            provider.shutdown()
+
+def create_app(settings: Settings | None = None, *, embedded: bool = False) -> FastAPI:
+    """`embedded=True` when another app (the gateway in monolith mode) hosts this one
+    in its process and owns logging and tracing setup."""
+    settings = settings or default_settings
+    app = FastAPI(title="Service Orders", version="1.0.0", openapi_url="/openapi.json", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.embedded = embedded
+    app.state.shards = ShardSet.from_settings(settings)
+    app.state.users_client = None
+    app.state.user_checker = None
+    app.state.hub = EventHub(settings.sse_queue_size)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[o.strip() for o in settings.cors_allow_origins.split(",")] if settings.cors_allow_origins != "*" else ["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, service_name="service_orders", settings=settings)
+    FastAPIInstrumentor.instrument_app(app)
+    return app
+
+app = create_app()
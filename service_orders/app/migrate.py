@@ -0,0 +1,27 @@
+"""Schema migration step, run once per deployment before the workers start:
+
+    python -m app.migrate                   # inside the image
+    python -m service_orders.app.migrate    # from the repository root
+"""
+from common.config import settings
+from common.db import make_engine
+
+from .db import Base
+from .shards import shard_urls
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+
+def migrate(database_url: str) -> None:
+    engine = make_engine(database_url)
+    try:
+        Base.metadata.create_all(bind=engine)
+        # create_all skips the indexes of tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    # every shard when ORDERS_SHARD_URLS is set, DATABASE_URL otherwise
+    for url in shard_urls(settings).values():
+        migrate(url)
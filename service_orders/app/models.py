@@ -1,18 +1,18 @@
 from __future__ import annotations
 
+import json
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Float
+from sqlalchemy import String, DateTime, Float, Index, literal, select, union_all
 from sqlalchemy.orm import Mapped, mapped_column
 from .db import Base
 
 def utcnow():
     return datetime.utcnow()
 
-class Order(Base):
-    __tablename__ = "orders"
-
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+class OrderColumns:
+    # "<shard>.<uuid4>" when sharded, see shards.ShardSet.new_order_id
+    id: Mapped[str] = mapped_column(String(64), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id: Mapped[str] = mapped_column(String(36), nullable=False, index=True)
     items_json: Mapped[str] = mapped_column(String, nullable=False)  # json array
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="created")
@@ -21,13 +21,42 @@ class Order(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=utcnow, onupdate=utcnow)
 
     def to_public(self) -> dict:
-        import json
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "items": json.loads(self.items_json),
-            "status": self.status,
-            "total_sum": self.total_sum,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
+        return order_to_public(self)
+
+class Order(OrderColumns, Base):
+    __tablename__ = "orders"
+    # the archiver's scan: terminal orders by age
+    __table_args__ = (Index("ix_orders_status_updated_at", "status", "updated_at"),)
+
+    archived = False
+
+class OrderArchive(OrderColumns, Base):
+    """Completed/cancelled orders moved out of `orders` by the archiver; read-only."""
+    __tablename__ = "orders_archive"
+
+    archived = True
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=utcnow)
+
+ORDER_COLUMNS = [c.key for c in Order.__table__.columns]
+
+def order_to_public(o) -> dict:
+    """Public shape of an Order, OrderArchive or `orders_view` row."""
+    return {
+        "id": o.id,
+        "user_id": o.user_id,
+        "items": json.loads(o.items_json),
+        "status": o.status,
+        "total_sum": o.total_sum,
+        "created_at": o.created_at.isoformat(),
+        "updated_at": o.updated_at.isoformat(),
+        "archived": bool(o.archived),
+    }
+
+def orders_view(include_archived: bool = False):
+    """Selectable over `orders` (plus `orders_archive` when asked) with an `archived` column."""
+    def rows(model, archived: bool):
+        return select(*(model.__table__.c[k] for k in ORDER_COLUMNS), literal(archived).label("archived"))
+    q = rows(Order, False)
+    if include_archived:
+        q = union_all(q, rows(OrderArchive, True))
+    return q.subquery("orders_view")
@@ -0,0 +1,125 @@
+"""Move orders onto the shards the ring assigns them to after the shard list changed:
+
+    python -m app.rebalance --from "s0=sqlite:////data/o0.db" \\
+        --to "s0=sqlite:////data/o0.db,s1=sqlite:////data/o1.db"
+
+Run it with the new ORDERS_SHARD_URLS already deployed (new orders go to the
+right shard; moved ones are still found because get_order falls back to the
+other shards). Each batch is copied and committed on the target before it is
+deleted from the source, so an interrupted run is safe to repeat. A row is only
+deleted if its updated_at is unchanged since the copy; rows written meanwhile
+are copied again. Archived orders move along with the hot ones; order ids keep
+their original shard tag.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from collections import Counter
+from itertools import product
+
+from sqlalchemy import select, delete
+
+from common.config import settings
+from common.db import Database
+from .db import Base
+from .models import Order, OrderArchive
+from .shards import HashRing, parse_shard_urls
+
+def _columns(row) -> dict:
+    return {c.key: getattr(row, c.key) for c in type(row).__table__.columns}
+
+def _move(src, target, model, orders: list) -> None:
+    """Copy `orders` to `target`, then delete the source rows that were not written meanwhile."""
+    while orders:
+        ids = [o.id for o in orders]
+        dst = target.session()
+        try:
+            # replaces stale copies left by an earlier attempt
+            dst.execute(delete(model).where(model.id.in_(ids)))
+            dst.add_all(model(**_columns(o)) for o in orders)
+            dst.commit()
+        finally:
+            dst.close()
+        changed = []
+        for o in orders:
+            if not src.execute(delete(model).where(model.id == o.id, model.updated_at == o.updated_at)).rowcount:
+                changed.append(o.id)
+        src.commit()
+        src.expire_all()
+        orders = src.scalars(select(model).where(model.id.in_(changed))).all() if changed else []
+        gone = set(changed) - {o.id for o in orders}
+        if gone:
+            # left the source table meanwhile (archived): drop the copy as well
+            dst = target.session()
+            try:
+                dst.execute(delete(model).where(model.id.in_(gone)))
+                dst.commit()
+            finally:
+                dst.close()
+
+def rebalance(source_urls: dict[str, str], target_urls: dict[str, str], *, vnodes: int = 64,
+              batch_size: int = 500, dry_run: bool = False) -> Counter:
+    """Returns the number of orders moved per (source, target) shard pair."""
+    for name in source_urls.keys() & target_urls.keys():
+        if source_urls[name] != target_urls[name]:
+            raise ValueError(f"Shard {name!r} has different urls in --from and --to")
+    ring = HashRing(list(target_urls), vnodes)
+    databases = {name: Database(url) for name, url in {**source_urls, **target_urls}.items()}
+    moved: Counter = Counter()
+    try:
+        if not dry_run:
+            for name in target_urls:
+                Base.metadata.create_all(bind=databases[name].engine)
+
+        for source, model in product(source_urls, (Order, OrderArchive)):
+            after_id = None
+            while True:
+                src = databases[source].session()
+                try:
+                    q = select(model).order_by(model.id).limit(batch_size)
+                    if after_id is not None:
+                        q = q.where(model.id > after_id)
+                    batch = src.scalars(q).all()
+                    if not batch:
+                        break
+                    after_id = batch[-1].id
+
+                    by_target: dict[str, list] = {}
+                    for order in batch:
+                        target = ring.node_for(order.user_id)
+                        if target != source:
+                            by_target.setdefault(target, []).append(order)
+
+                    for target, orders in by_target.items():
+                        moved[(source, target)] += len(orders)
+                        if not dry_run:
+                            _move(src, databases[target], model, orders)
+                finally:
+                    src.close()
+    finally:
+        for database in databases.values():
+            database.dispose()
+    return moved
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.rebalance", description=__doc__.splitlines()[0])
+    p.add_argument("--from", dest="source", required=True, help="shard list before the change (name=url,...)")
+    p.add_argument("--to", dest="target", default=settings.orders_shard_urls,
+                   help="shard list after the change, ORDERS_SHARD_URLS by default")
+    p.add_argument("--vnodes", type=int, default=settings.orders_shard_vnodes)
+    p.add_argument("--batch-size", type=int, default=500)
+    p.add_argument("--dry-run", action="store_true", help="only count the orders that would move")
+    args = p.parse_args(argv)
+
+    source, target = parse_shard_urls(args.source), parse_shard_urls(args.target)
+    if not source or not target:
+        p.error("--from and --to must both name at least one shard")
+    moved = rebalance(source, target, vnodes=args.vnodes, batch_size=args.batch_size, dry_run=args.dry_run)
+    for (src, dst), count in sorted(moved.items()):
+        print(f"{src} -> {dst}: {count}")
+    print(f"total: {sum(moved.values())}{' (dry run)' if args.dry_run else ''}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+from typing import AsyncIterator
+
+from sqlalchemy import select, func, desc
+from starlette.concurrency import run_in_threadpool
+
+from .models import orders_view, order_to_public
+from .shards import ShardSet
+
+def _shard_page(shards: ShardSet, shard: str, limit: int, status: str | None,
+                include_archived: bool) -> tuple[int, list[dict]]:
+    db = shards.session(shard)
+    try:
+        orders = orders_view(include_archived)
+        q = select(orders)
+        if status:
+            q = q.where(orders.c.status == status)
+        total = db.scalar(select(func.count()).select_from(q.subquery()))
+        rows = db.execute(q.order_by(desc(orders.c.created_at), desc(orders.c.id)).limit(limit)).all()
+        return int(total or 0), [order_to_public(o) for o in rows]
+    finally:
+        db.close()
+
+async def list_all_orders(shards: ShardSet, page: int, page_size: int, status: str | None = None,
+                          include_archived: bool = False) -> dict:
+    """Newest-first page over every shard.
+
+    Each shard is queried concurrently for its first page*page_size rows and
+    the sorted results are merged, so deep pages cost more on every shard.
+    """
+    limit = page * page_size
+    results = await asyncio.gather(*(
+        run_in_threadpool(_shard_page, shards, shard, limit, status, include_archived) for shard in shards.names
+    ))
+    merged = heapq.merge(*(rows for _, rows in results), key=lambda o: (o["created_at"], o["id"]), reverse=True)
+    items = list(merged)[(page - 1) * page_size:limit]
+    return {
+        "items": items,
+        "page": page,
+        "page_size": page_size,
+        "total": sum(total for total, _ in results),
+    }
+
+def _shard_batch(shards: ShardSet, shard: str, after_id: str | None, batch_size: int,
+                 include_archived: bool) -> list[dict]:
+    db = shards.session(shard)
+    try:
+        orders = orders_view(include_archived)
+        q = select(orders).order_by(orders.c.id).limit(batch_size)
+        if after_id is not None:
+            q = q.where(orders.c.id > after_id)
+        return [order_to_public(o) for o in db.execute(q).all()]
+    finally:
+        db.close()
+
+async def export_orders(shards: ShardSet, batch_size: int = 1000, include_archived: bool = False) -> AsyncIterator[dict]:
+    """Every order of every shard, read concurrently in keyset batches.
+
+    Shards are interleaved as their batches arrive (no global order); the
+    bounded queue keeps readers at most a couple of batches ahead of the client.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * len(shards.names))
+
+    async def read(shard: str) -> None:
+        after_id = None
+        try:
+            while True:
+                batch = await run_in_threadpool(_shard_batch, shards, shard, after_id, batch_size, include_archived)
+                if not batch:
+                    break
+                await queue.put(batch)
+                after_id = batch[-1]["id"]
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    readers = [asyncio.create_task(read(shard)) for shard in shards.names]
+    try:
+        remaining = len(readers)
+        while remaining:
+            batch = await queue.get()
+            if batch is None:
+                remaining -= 1
+                continue
+            for order in batch:
+                yield order
+        # surfaces a failed shard instead of a silently short export
+        await asyncio.gather(*readers)
+    finally:
+        for reader in readers:
+            reader.cancel()
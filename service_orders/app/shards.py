@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from common.config import Settings
+from common.db import Database
+from .models import orders_view
+
+# order ids are "<shard>.<uuid4>" once sharding is configured; plain uuids are legacy/unsharded
+ORDER_ID_SEPARATOR = "."
+
+def parse_shard_urls(spec: str) -> dict[str, str]:
+    """`"s0=sqlite:////data/o0.db,s1=sqlite:////data/o1.db"` -> {"s0": ..., "s1": ...}"""
+    shards: dict[str, str] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, url = part.partition("=")
+        name = name.strip()
+        if not sep or not name or not url or ORDER_ID_SEPARATOR in name:
+            raise ValueError(f"Invalid shard spec {part!r}, expected name=database_url")
+        if name in shards:
+            raise ValueError(f"Duplicate shard name {name!r}")
+        shards[name] = url.strip()
+    return shards
+
+def shard_urls(settings: Settings) -> dict[str, str]:
+    return parse_shard_urls(settings.orders_shard_urls) or {"default": settings.database_url}
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    """Consistent hashing of user ids onto shard names.
+
+    Each shard owns `vnodes` points on the ring, so adding a shard moves only
+    about 1/N of the users, all of them onto the new shard.
+    """
+    def __init__(self, names: list[str], vnodes: int = 64):
+        if not names:
+            raise ValueError("HashRing needs at least one shard")
+        points = sorted((_hash(f"{name}#{i}"), name) for name in names for i in range(vnodes))
+        self._keys = [p[0] for p in points]
+        self._names = [p[1] for p in points]
+
+    def node_for(self, key: str) -> str:
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._names[idx]
+
+def split_order_id(order_id: str) -> tuple[str | None, str]:
+    shard, sep, rest = order_id.partition(ORDER_ID_SEPARATOR)
+    return (shard, rest) if sep else (None, order_id)
+
+class ShardSet:
+    """The orders databases of this deployment, keyed by shard name.
+
+    Without ORDERS_SHARD_URLS there is a single shard on DATABASE_URL and order
+    ids stay plain uuids.
+    """
+    def __init__(self, urls: dict[str, str], vnodes: int = 64, sharded: bool = True, slow_query_ms: float = 0.0):
+        self.databases = {name: Database(url, slow_query_ms) for name, url in urls.items()}
+        self.ring = HashRing(list(urls), vnodes)
+        self.sharded = sharded
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ShardSet":
+        urls = parse_shard_urls(settings.orders_shard_urls)
+        if not urls:
+            return cls(shard_urls(settings), sharded=False, slow_query_ms=settings.slow_query_ms)
+        return cls(urls, settings.orders_shard_vnodes, slow_query_ms=settings.slow_query_ms)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.databases)
+
+    def shard_for_user(self, user_id: str) -> str:
+        return self.ring.node_for(user_id)
+
+    def new_order_id(self, shard: str) -> str:
+        oid = str(uuid.uuid4())
+        return f"{shard}{ORDER_ID_SEPARATOR}{oid}" if self.sharded else oid
+
+    def session(self, shard: str) -> Session:
+        return self.databases[shard].session()
+
+    def candidates_for_order(self, order_id: str) -> list[str]:
+        # the tagged shard first; the rest only matter for legacy ids and orders moved by a rebalance
+        tagged, _ = split_order_id(order_id)
+        if tagged in self.databases:
+            return [tagged] + [n for n in self.databases if n != tagged]
+        return self.names
+
+    def home_shard(self, order_id: str) -> str:
+        """The shard `order_id` is tagged with (the first shard for untagged ids)."""
+        return self.candidates_for_order(order_id)[0]
+
+    def find_order(self, order_id: str, db: Session, include_archived: bool = False) -> tuple[str, Row] | None:
+        """(shard, `orders_view` row) of `order_id`: one query on `db`, the session on
+        its home shard, then one per other shard until it is found."""
+        orders = orders_view(include_archived)
+        q = select(orders).where(orders.c.id == order_id)
+        row = db.execute(q).first()
+        if row is not None:
+            return db.info["shard"], row
+        for name in self.candidates_for_order(order_id):
+            if name == db.info["shard"]:
+                continue
+            other = self.session(name)
+            try:
+                row = other.execute(q).first()
+            finally:
+                other.close()
+            if row is not None:
+                return name, row
+        return None
+
+    def dispose(self) -> None:
+        for database in self.databases.values():
+            database.dispose()
@@ -1,12 +1,4 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase
 
 class Base(DeclarativeBase):
     pass
-
-def make_engine(database_url: str):
-    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
-    return create_engine(database_url, future=True, echo=False, connect_args=connect_args)
-
-def make_session_factory(engine):
-    return sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
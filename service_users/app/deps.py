@@ -1,21 +1,20 @@
 from __future__ import annotations
 from typing import Generator
 
-from fastapi import Depends, Header
+from fastapi import Depends, Header, Request
 from sqlalchemy.orm import Session
 
-from common.config import settings
+from common.config import Settings
 from common.auth import get_bearer_token, decode_token, JwtError
 from common.responses import fail
-from .db import make_engine, make_session_factory
 from .models import User
 from sqlalchemy import select
 
-engine = make_engine(settings.database_url)
-SessionLocal = make_session_factory(engine)
+def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+def get_db(request: Request) -> Generator[Session, None, None]:
+    db = request.app.state.db.session()
     try:
         yield db
     finally:
@@ -26,7 +25,10 @@ class AuthUser:
         self.user_id = user_id
         self.roles = roles
 
-def get_current_user(authorization: str | None = Header(default=None)) -> AuthUser:
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    settings: Settings = Depends(get_settings),
+) -> AuthUser:
     token = get_bearer_token(authorization)
     if not token:
         raise fail("UNAUTHORIZED", "Missing bearer token", 401)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .models import User
+
+def user_exists(db: Session, user_id: str) -> bool:
+    return db.scalar(select(User.id).where(User.id == user_id)) is not None
+
+def make_user_checker(app: FastAPI) -> Callable[[str, str | None], Awaitable[bool]]:
+    """In-process replacement for GET /v1/users/internal/{user_id}, for callers
+    hosted in the same process as `app` (service_orders in monolith mode)."""
+    def check(user_id: str) -> bool:
+        db = app.state.db.session()
+        try:
+            return user_exists(db, user_id)
+        finally:
+            db.close()
+
+    async def checker(user_id: str, request_id: str | None = None) -> bool:
+        return await run_in_threadpool(check, user_id)
+
+    return checker
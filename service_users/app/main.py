@@ -1,44 +1,32 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, Depends, Query
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, APIRouter, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import select, func
 from sqlalchemy.exc import IntegrityError
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
 
-from common.config import settings
+from common.config import Settings, settings as default_settings
 from common.responses import ok, fail
 from common.logging import setup_logging, get_logger
 from common.tracing import setup_tracing
+from common.profiling import ProfilingMiddleware
 
-from .db import Base
-from .deps import engine, get_db, get_current_user, require_admin, get_user_by_id, AuthUser
+from common.db import Database, instrument_sqlalchemy
+from .internal import user_exists
+from .deps import get_db, get_settings, get_current_user, require_admin, get_user_by_id, AuthUser
 from .models import User
 from .schemas import RegisterRequest, LoginRequest, UpdateProfileRequest
 from .security import hash_password, verify_password
 from common.auth import create_token
 
-setup_logging("service_users")
-setup_tracing("service_users", settings.otel_service_namespace, settings.otel_exporter_otlp_endpoint)
-
-Base.metadata.create_all(bind=engine)
-SQLAlchemyInstrumentor().instrument(engine=engine)
-
-app = FastAPI(title="Service Users", version="1.0.0", openapi_url="/openapi.json")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[o.strip() for o in settings.cors_allow_origins.split(",")] if settings.cors_allow_origins != "*" else ["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-FastAPIInstrumentor.instrument_app(app)
 log = get_logger("service_users")
+router = APIRouter()
 
-@app.post("/v1/users/register")
+@router.post("/v1/users/register")
 def register(payload: RegisterRequest, db=Depends(get_db)):
     user = User(email=payload.email, password_hash=hash_password(payload.password), name=payload.name, roles="user")
     db.add(user)
@@ -50,8 +38,8 @@ def register(payload: RegisterRequest, db=Depends(get_db)):
     db.refresh(user)
     return ok(user.to_public())
 
-@app.post("/v1/users/login")
-def login(payload: LoginRequest, db=Depends(get_db)):
+@router.post("/v1/users/login")
+def login(payload: LoginRequest, db=Depends(get_db), settings: Settings = Depends(get_settings)):
     user = db.scalar(select(User).where(User.email == payload.email))
     if not user or not verify_password(payload.password, user.password_hash):
         return fail("INVALID_CREDENTIALS", "Invalid email or password", 401)
@@ -65,14 +53,14 @@ def login(payload: LoginRequest, db=Depends(get_db)):
     )
     return ok({"token": token})
 
-@app.get("/v1/users/me")
+@router.get("/v1/users/me")
 def me(auth: AuthUser = Depends(get_current_user), db=Depends(get_db)):
     user = get_user_by_id(db, auth.user_id)
     if not user:
         return fail("NOT_FOUND", "User not found", 404)
     return ok(user.to_public())
 
-@app.put("/v1/users/me")
+@router.put("/v1/users/me")
 def update_me(payload: UpdateProfileRequest, auth: AuthUser = Depends(get_current_user), db=Depends(get_db)):
     user = get_user_by_id(db, auth.user_id)
     if not user:
@@ -84,7 +72,7 @@ def update_me(payload: UpdateProfileRequest, auth: AuthUser = Depends(get_curren
     db.refresh(user)
     return ok(user.to_public())
 
-@app.get("/v1/users")
+@router.get("/v1/users")
 def list_users(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -104,9 +92,52 @@ def list_users(
         "total": int(total or 0),
     })
 
-@app.get("/v1/users/internal/{user_id}")
+@router.get("/v1/users/internal/{user_id}")
 def internal_user_exists(user_id: str, db=Depends(get_db)):
-    user = db.scalar(select(User).where(User.id == user_id))
-    if not user:
+    if not user_exists(db, user_id):
         return fail("NOT_FOUND", "User not found", 404)
-    return ok({"exists": True, "id": user.id})
+    return ok({"exists": True, "id": user_id})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # runs in every worker after fork: tracing exporter thread, engine and its pool live here
+    started = time.perf_counter()
+    settings: Settings = app.state.settings
+    provider = None
+    if not app.state.embedded:
+        setup_logging("service_users")
+        provider = setup_tracing("service_users", settings.otel_service_namespace, settings.otel_exporter_otlp_endpoint)
+    instrument_sqlalchemy()
+    with app.state.db.engine.connect():
+        pass
+    app.state.startup_ms = (time.perf_counter() - started) * 1000
+    log.info("startup completed in %.1f ms", app.state.startup_ms)
+    try:
+        yield
+    finally:
+        app.state.db.dispose()
+        if provider is not None:
+            provider.shutdown()
+
+def create_app(settings: Settings | None = None, *, embedded: bool = False) -> FastAPI:
+    """`embedded=True` when another app (the gateway in monolith mode) hosts this one
+    in its process and owns logging and tracing setup."""
+    settings = settings or default_settings
+    app = FastAPI(title="Service Users", version="1.0.0", openapi_url="/openapi.json", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.embedded = embedded
+    app.state.db = Database(settings.database_url, settings.slow_query_ms)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[o.strip() for o in settings.cors_allow_origins.split(",")] if settings.cors_allow_origins != "*" else ["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, service_name="service_users", settings=settings)
+    FastAPIInstrumentor.instrument_app(app)
+    return app
+
+app = create_app()
@@ -0,0 +1,20 @@
+"""Schema migration step, run once per deployment before the workers start:
+
+    python -m app.migrate                   # inside the image
+    python -m service_users.app.migrate     # from the repository root
+"""
+from common.config import settings
+from common.db import make_engine
+
+from .db import Base
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+
+def migrate(database_url: str) -> None:
+    engine = make_engine(database_url)
+    try:
+        Base.metadata.create_all(bind=engine)
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    migrate(settings.database_url)
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    # runs before test modules are imported and load the settings: every run gets a
+    # fresh database in pytest's temp dir instead of ./app.db
+    db_dir = config._tmp_path_factory.mktemp("db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_dir / 'app.db'}"
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_db():
+    # imported lazily: test modules set env vars before the settings are first loaded
+    from common.config import settings
+    from service_users.app.migrate import migrate as migrate_users
+    from service_orders.app.migrate import migrate as migrate_orders
+
+    migrate_users(settings.database_url)
+    migrate_orders(settings.database_url)
+
+@pytest.fixture
+def migrated_url(tmp_path):
+    """Factory for SQLite files under tmp_path with both services' schemas."""
+    from service_users.app.migrate import migrate as migrate_users
+    from service_orders.app.migrate import migrate as migrate_orders
+
+    def make(name: str = "app") -> str:
+        url = f"sqlite:///{tmp_path / name}.db"
+        migrate_users(url)
+        migrate_orders(url)
+        return url
+    return make
+
+@pytest.fixture
+def monolith_app(migrated_url):
+    from common.config import Settings
+    from api_gateway.app.main import create_app
+
+    return create_app(Settings(gateway_mode="monolith", database_url=migrated_url("monolith"), disable_user_check=False))
+
+@pytest.fixture
+def auth_headers():
+    """Factory for Authorization headers carrying a token signed with the test settings."""
+    from common.auth import create_token
+    from common.config import settings
+
+    def make(user_id: str, roles=("user",)) -> dict:
+        token = create_token(user_id=user_id, roles=list(roles), secret=settings.jwt_secret,
+                             issuer=settings.jwt_issuer, audience=settings.jwt_audience, exp_minutes=5)
+        return {"Authorization": f"Bearer {token}"}
+    return make
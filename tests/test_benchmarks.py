@@ -0,0 +1,24 @@
+from benchmarks.stats import EndpointStats, build_report, compare, percentile
+
+def test_percentile_nearest_rank():
+    values = sorted(float(v) for v in range(1, 101))
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 99) == 0.0
+
+def test_compare_flags_regressions_over_threshold():
+    s = EndpointStats()
+    for v in range(1, 101):
+        s.record(float(v), ok=True)
+    baseline = build_report({"GET /v1/orders": s}, 10.0, {})
+
+    slower = EndpointStats()
+    for v in range(1, 101):
+        slower.record(float(v) * 1.5, ok=True)
+    report = build_report({"GET /v1/orders": slower}, 10.0, {})
+
+    assert compare(baseline, baseline, 0.1) == []
+    regressions = compare(report, baseline, 0.1)
+    assert any("p95_ms" in r for r in regressions)
+    assert compare(report, baseline, 0.6) == []
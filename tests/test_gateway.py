@@ -0,0 +1,193 @@
+from fastapi.testclient import TestClient
+
+def test_monolith_mode_routes_in_process(monolith_app):
+    with TestClient(monolith_app) as gw:
+        r = gw.post("/v1/users/register", json={"email":"mono@example.com","password":"password123","name":"Mono"})
+        assert r.status_code == 200
+        token = gw.post("/v1/users/login", json={"email":"mono@example.com","password":"password123"}).json()["data"]["token"]
+        headers = {"Authorization": f"Bearer {token}", "X-Request-ID": "mono-1"}
+
+        r = gw.post("/v1/orders", json={"items":[{"product":"sand","quantity":1}],"total_sum":5.0}, headers=headers)
+        assert r.status_code == 200
+        assert r.headers["X-Request-ID"] == "mono-1"
+
+        r = gw.get("/v1/orders", headers=headers)
+        assert r.json()["data"]["total"] == 1
+
+def test_monolith_mode_keeps_gateway_auth(monolith_app):
+    with TestClient(monolith_app) as gw:
+        r = gw.get("/v1/orders")
+        assert r.status_code == 401
+        assert r.json()["error"]["code"] == "UNAUTHORIZED"
+
+def test_order_events_stream_through_gateway(monolith_app):
+    import asyncio
+    import json
+    import httpx
+    from api_gateway.app.monolith import StreamingASGITransport
+
+    app = monolith_app
+
+    async def scenario():
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=StreamingASGITransport(app), base_url="http://gateway", timeout=10.0,
+        ) as gw:
+            await gw.post("/v1/users/register", json={"email":"sse@example.com","password":"password123","name":"Sse"})
+            token = (await gw.post("/v1/users/login", json={"email":"sse@example.com","password":"password123"})).json()["data"]["token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            order_id = (await gw.post("/v1/orders", json={"items":[{"product":"sand","quantity":1}],"total_sum":5.0},
+                                      headers=headers)).json()["data"]["id"]
+
+            async with gw.stream("GET", "/v1/orders/events", headers=headers) as stream:
+                assert stream.headers["content-type"].startswith("text/event-stream")
+                lines = stream.aiter_lines()
+                assert (await lines.__anext__()).startswith("retry:")
+                r = await gw.patch(f"/v1/orders/{order_id}/status", json={"status":"in_progress"}, headers=headers)
+                assert r.status_code == 200
+                while True:
+                    line = await asyncio.wait_for(lines.__anext__(), timeout=5)
+                    if line.startswith("data: "):
+                        return json.loads(line[len("data: "):])
+
+    frame = asyncio.run(scenario())
+    assert frame["event"] == "order.status_updated"
+    assert frame["payload"]["order_id"]
+    assert frame["payload"]["status"] == "in_progress"
+    assert app.state.embedded_apps["orders"].state.hub.connections == 0
+
+def test_dashboard_merges_sections_and_reports_partial_failures(monolith_app):
+    import httpx
+    with TestClient(monolith_app) as gw:
+        gw.post("/v1/users/register", json={"email":"dash@example.com","password":"password123","name":"Dash"})
+        token = gw.post("/v1/users/login", json={"email":"dash@example.com","password":"password123"}).json()["data"]["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        gw.post("/v1/orders", json={"items":[{"product":"glue","quantity":2}],"total_sum":7.0}, headers=headers)
+
+        assert gw.get("/v1/dashboard").status_code == 401
+
+        r = gw.get("/v1/dashboard", headers=headers)
+        assert r.status_code == 200
+        data = r.json()["data"]
+        assert data["profile"]["email"] == "dash@example.com"
+        assert data["orders"]["total"] == 1
+        assert data["errors"] == {}
+
+        upstreams = gw.app.state.upstreams
+        upstreams["orders"] = httpx.AsyncClient(
+            base_url="http://orders.internal",
+            transport=httpx.MockTransport(lambda request: httpx.Response(503, text="down")),
+        )
+        r = gw.get("/v1/dashboard", headers=headers)
+        assert r.status_code == 200
+        data = r.json()["data"]
+        assert data["profile"]["email"] == "dash@example.com"
+        assert data["orders"] is None
+        assert data["errors"]["orders"]["code"] == "UPSTREAM_ERROR"
+
+def test_proxy_relays_upstream_compression_only_when_the_client_asked():
+    import asyncio
+    import gzip
+    import json
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.middleware.gzip import GZipMiddleware
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+    from common.config import Settings
+    from api_gateway.app.main import create_app
+    from api_gateway.app.monolith import StreamingASGITransport
+
+    seen = []
+    def login(request):
+        seen.append(request.headers.get("accept-encoding"))
+        return JSONResponse({"items": ["brick"] * 500})
+    upstream = Starlette(routes=[Route("/v1/users/login", login, methods=["POST"])])
+    upstream.add_middleware(GZipMiddleware, minimum_size=0)
+
+    gateway = create_app(Settings())
+    gateway.state.upstreams["users"] = httpx.AsyncClient(base_url="http://users.internal",
+                                                         transport=StreamingASGITransport(upstream))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=StreamingASGITransport(gateway), base_url="http://gateway") as gw:
+            del gw.headers["accept-encoding"]
+            plain = await gw.post("/v1/users/login")
+            async with gw.stream("POST", "/v1/users/login", headers={"Accept-Encoding": "gzip"}) as r:
+                raw = b"".join([chunk async for chunk in r.aiter_raw()])
+            return plain, r, raw
+
+    plain, compressed, raw = asyncio.run(scenario())
+    assert seen == ["identity", "gzip"]
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == {"items": ["brick"] * 500}
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(raw)) == {"items": ["brick"] * 500}
+
+def test_compression_negotiation_threshold_passthrough_and_streams():
+    import asyncio
+    import gzip
+    import zlib
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response, StreamingResponse
+    from starlette.routing import Route
+    from common.config import Settings
+    from api_gateway.app.compression import CompressionMiddleware, negotiate
+
+    assert negotiate("gzip, br;q=0.5", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("br, gzip", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("*;q=0.1, gzip;q=0", ["gzip"]) is None
+    assert negotiate("identity", ["gzip"]) is None
+
+    big = {"items": [{"product": "bricks", "quantity": i} for i in range(200)]}
+    pre_encoded = gzip.compress(b'{"already": "gzipped"}' * 100)
+
+    async def events(request):
+        async def frames():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    app = Starlette(routes=[
+        Route("/big", lambda r: JSONResponse(big)),
+        Route("/small", lambda r: JSONResponse({"ok": True})),
+        Route("/png", lambda r: Response(b"\x89PNG" * 1000, media_type="image/png")),
+        Route("/pre", lambda r: Response(pre_encoded, media_type="application/json", headers={"Content-Encoding": "gzip"})),
+        Route("/events", events),
+    ])
+    # SSE is compressed only when opted in: each open stream would hold its own compressor
+    default_types = CompressionMiddleware(app, Settings()).content_types
+    assert not "text/event-stream".startswith(default_types)
+    app.add_middleware(CompressionMiddleware, settings=Settings(
+        compression_encodings="gzip", compression_content_types=",".join(default_types + ("text/event-stream",))))
+    client = TestClient(app)
+
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and "Accept-Encoding" in r.headers["vary"]
+    assert r.json() == big
+    with client.stream("GET", "/big", headers={"Accept-Encoding": "gzip"}) as r:
+        raw = b"".join(r.iter_raw())
+    assert len(raw) < len(JSONResponse(big).body)
+    assert int(r.headers["content-length"]) == len(raw)
+
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/png", headers={"Accept-Encoding": "gzip"}).headers
+
+    with client.stream("GET", "/pre", headers={"Accept-Encoding": "gzip"}) as r:
+        assert b"".join(r.iter_raw()) == pre_encoded
+
+    # driven directly: the test transport would merge the streamed chunks
+    messages = []
+    async def receive():
+        await asyncio.Event().wait()  # the client never disconnects
+    async def send(message):
+        messages.append(message)
+    scope = {"type": "http", "method": "GET", "path": "/events", "raw_path": b"/events", "query_string": b"",
+             "headers": [(b"accept-encoding", b"gzip")], "scheme": "http", "server": ("test", 80),
+             "root_path": "", "http_version": "1.1"}
+    asyncio.run(app(scope, receive, send))
+    assert (b"content-encoding", b"gzip") in messages[0]["headers"]
+    decoder = zlib.decompressobj(31)
+    # every chunk is flushed, so each frame decodes without waiting for the next one
+    frames = [decoder.decompress(m["body"]) for m in messages[1:]]
+    assert frames[:3] == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n"]
@@ -50,3 +50,223 @@ def test_cancel_own_order():
     r2 = orders.post(f"/v1/orders/{order_id}/cancel", headers={"Authorization": f"Bearer {token}"})
     assert r2.status_code == 200
     assert r2.json()["data"]["status"] == "cancelled"
+
+def test_event_hub_delivers_only_to_owner_and_admins():
+    from service_orders.app.events import DomainEvent
+    from service_orders.app.hub import EventHub
+
+    async def scenario():
+        hub = EventHub(queue_size=2)
+        hub.bind(asyncio.get_running_loop())
+        owner = hub.subscribe("u1", is_admin=False)
+        other = hub.subscribe("u2", is_admin=False)
+        admin = hub.subscribe("root", is_admin=True)
+        for status in ("in_progress", "completed", "cancelled"):
+            hub.publish(DomainEvent(name="order.status_updated", payload={"order_id": "o1", "user_id": "u1", "status": status}))
+        hub.publish(DomainEvent(name="order.created", payload={"order_id": "o2", "user_id": "u1"}))
+        await asyncio.sleep(0)
+        return owner, other, admin
+
+    owner, other, admin = asyncio.run(scenario())
+    assert other.queue.empty()
+    assert owner.queue.qsize() == 2 and admin.queue.qsize() == 2
+    # the queue is bounded: the oldest frame was dropped for the lagging subscriber
+    assert owner.dropped == 1
+    frames = [owner.queue.get_nowait() for _ in range(2)]
+    assert '"status": "completed"' in frames[0] and '"status": "cancelled"' in frames[1]
+
+def test_sharded_orders_route_by_user_and_rebalance(tmp_path, migrated_url, auth_headers):
+    import json
+    import uuid
+    from sqlalchemy import event
+    from common.config import settings
+    from service_orders.app.main import create_app
+    from service_orders.app.rebalance import rebalance
+
+    urls = {name: migrated_url(name) for name in ("s0", "s1")}
+    spec = ",".join(f"{name}={url}" for name, url in urls.items())
+    app = create_app(settings.model_copy(update={"orders_shard_urls": spec}))
+    shards = app.state.shards
+    token = auth_headers
+
+    user_ids = [f"user-{i}" for i in range(8)]
+    with TestClient(app) as client:
+        for uid in user_ids:
+            r = client.post("/v1/orders", json={"items": [{"product": "sand", "quantity": 1}], "total_sum": 1.0},
+                            headers=token(uid))
+            order_id = r.json()["data"]["id"]
+            assert order_id.split(".")[0] == shards.shard_for_user(uid)
+            assert client.get(f"/v1/orders/{order_id}", headers=token(uid)).status_code == 200
+
+        admin = token("admin-1", ("admin",))
+        r = client.get("/v1/orders/all?page=1&page_size=5", headers=admin)
+        assert r.json()["data"]["total"] == len(user_ids)
+        created = [o["created_at"] for o in r.json()["data"]["items"]]
+        assert created == sorted(created, reverse=True)
+
+        r = client.get("/v1/orders/export", headers=admin)
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        exported = [json.loads(line) for line in r.text.splitlines()]
+        assert sorted(o["user_id"] for o in exported) == user_ids
+
+    # adding s2 moves orders only onto the new shard; moved ids are still found
+    urls["s2"] = f"sqlite:///{tmp_path / 's2'}.db"
+    moved = rebalance({n: urls[n] for n in ("s0", "s1")}, urls, vnodes=settings.orders_shard_vnodes)
+    assert moved and all(dst == "s2" for _, dst in moved)
+    spec = ",".join(f"{name}={url}" for name, url in urls.items())
+    app = create_app(settings.model_copy(update={"orders_shard_urls": spec}))
+    statements = []
+    for database in app.state.shards.databases.values():
+        event.listen(database.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with TestClient(app) as client:
+        for order in exported:
+            statements.clear()
+            assert client.get(f"/v1/orders/{order['id']}", headers=token(order["user_id"])).status_code == 200
+            # one query per shard tried: just the tagged one unless the order was moved
+            tried = app.state.shards.candidates_for_order(order["id"])
+            assert len(statements) == tried.index(app.state.shards.shard_for_user(order["user_id"])) + 1
+        statements.clear()
+        assert client.get(f"/v1/orders/s0.{uuid.uuid4()}", headers=admin).status_code == 404
+        assert len(statements) == 3
+        moved_order = next(o for o in exported if app.state.shards.shard_for_user(o["user_id"]) == "s2")
+        r = client.post(f"/v1/orders/{moved_order['id']}/cancel", headers=token(moved_order["user_id"]))
+        assert r.json()["data"]["status"] == "cancelled"
+        assert client.get("/v1/orders/all", headers=admin).json()["data"]["total"] == len(user_ids)
+
+def test_rebalance_keeps_writes_made_while_a_batch_is_copied(migrated_url):
+    import sqlite3
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from common.config import settings
+    from common.db import Database
+    from service_orders.app.models import Order
+    from service_orders.app.rebalance import rebalance
+    from service_orders.app.shards import HashRing
+
+    urls = {name: migrated_url(name) for name in ("s0", "s1")}
+    ring = HashRing(list(urls), settings.orders_shard_vnodes)
+    user_id = next(f"user-{i}" for i in range(100) if ring.node_for(f"user-{i}") == "s1")
+    source = Database(urls["s0"])
+    db = source.session()
+    db.add(Order(id="s0.moving", user_id=user_id, items_json="[]", status="created", total_sum=1.0))
+    db.commit()
+    db.close()
+    source.dispose()
+
+    # the service cancels the order right after the copy reached the target
+    copied = []
+    def on_insert(conn, cursor, statement, *args):
+        if str(conn.engine.url) == urls["s1"] and statement.startswith("INSERT INTO orders "):
+            copied.append(True)
+    def on_commit(conn):
+        if len(copied) == 1 and str(conn.engine.url) == urls["s1"]:
+            copied.append(True)
+            with sqlite3.connect(urls["s0"].removeprefix("sqlite:///")) as raw:
+                raw.execute("UPDATE orders SET status = 'cancelled', updated_at = '2030-01-01 00:00:00.000000'")
+    event.listen(Engine, "before_cursor_execute", on_insert)
+    event.listen(Engine, "commit", on_commit)
+    try:
+        rebalance({"s0": urls["s0"]}, urls, vnodes=settings.orders_shard_vnodes)
+    finally:
+        event.remove(Engine, "before_cursor_execute", on_insert)
+        event.remove(Engine, "commit", on_commit)
+
+    assert len(copied) > 2  # copied a second time after the write
+    target = Database(urls["s1"])
+    db = target.session()
+    assert db.get(Order, "s0.moving").status == "cancelled"
+    db.close()
+    target.dispose()
+    source = Database(urls["s0"])
+    db = source.session()
+    assert db.get(Order, "s0.moving") is None
+    db.close()
+    source.dispose()
+
+def test_archiver_moves_old_terminal_orders_and_reads_through(migrated_url, auth_headers):
+    from datetime import timedelta
+    from sqlalchemy import update
+    from common.config import settings
+    from service_orders.app.archive import archive_orders
+    from service_orders.app.main import create_app
+    from service_orders.app.models import Order, utcnow
+
+    app = create_app(settings.model_copy(update={"database_url": migrated_url("orders")}))
+    auth = auth_headers("archive-user")
+
+    with TestClient(app) as client:
+        ids = [client.post("/v1/orders", json={"items": [{"product": "tile", "quantity": 1}], "total_sum": 5.0},
+                           headers=auth).json()["data"]["id"] for _ in range(5)]
+        client.patch(f"/v1/orders/{ids[0]}/status", json={"status": "completed"}, headers=auth)
+        client.post(f"/v1/orders/{ids[1]}/cancel", headers=auth)
+        client.post(f"/v1/orders/{ids[2]}/cancel", headers=auth)  # recent: stays hot
+        db = app.state.shards.session("default")
+        db.execute(update(Order).where(Order.id.in_(ids[:2])).values(updated_at=utcnow() - timedelta(days=60)))
+        db.commit()
+        db.close()
+
+        moved = asyncio.run(archive_orders(app.state.shards, timedelta(days=30), batch_size=1, pause=0))
+        assert moved == {"default": 2}
+
+        assert client.get("/v1/orders", headers=auth).json()["data"]["total"] == 3
+        r = client.get("/v1/orders?include_archived=true&page_size=10", headers=auth)
+        assert r.json()["data"]["total"] == 5
+        assert {o["id"] for o in r.json()["data"]["items"] if o["archived"]} == set(ids[:2])
+
+        assert client.get(f"/v1/orders/{ids[0]}", headers=auth).status_code == 404
+        r = client.get(f"/v1/orders/{ids[0]}?include_archived=true", headers=auth)
+        assert r.status_code == 200 and r.json()["data"]["status"] == "completed"
+        r = client.patch(f"/v1/orders/{ids[0]}/status", json={"status": "created"}, headers=auth)
+        assert r.status_code == 409 and r.json()["error"]["code"] == "ORDER_ARCHIVED"
+
+def test_admin_profile_header_stores_flamegraph_under_request_id(tmp_path, auth_headers):
+    from common.config import settings
+    from service_orders.app.main import create_app
+
+    app = create_app(settings.model_copy(update={"profile_dir": str(tmp_path), "profile_interval_ms": 0.5}))
+
+    def auth(roles):
+        return {**auth_headers("profiled", roles), "X-Profile": "1", "X-Request-ID": "req-42"}
+
+    with TestClient(app) as client:
+        r = client.get("/v1/orders", headers=auth(["user"]))
+        assert r.status_code == 200 and "X-Profile-Id" not in r.headers
+
+        r = client.get("/v1/orders/all", headers=auth(["admin"]))
+        assert r.status_code == 200
+        assert r.headers["X-Profile-Id"] == "req-42.service_orders.folded"
+    profile = (tmp_path / "req-42.service_orders.folded").read_text()
+    for line in profile.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+def test_profile_dir_keeps_only_the_newest_profiles_per_service(tmp_path):
+    import os
+    from common.profiling import prune_profiles
+
+    for age, name in enumerate(["c.service_orders", "b.service_orders", "a.service_orders", "a.api_gateway"]):
+        path = tmp_path / f"{name}.folded"
+        path.write_text("main 1\n")
+        os.utime(path, (1_000_000 - age, 1_000_000 - age))
+    prune_profiles(tmp_path, "service_orders", keep_files=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "a.api_gateway.folded", "b.service_orders.folded", "c.service_orders.folded"]
+
+def test_slow_query_log_reports_parameter_types_and_plan(caplog):
+    import logging
+    import pytest
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from common.db import make_engine
+
+    engine = make_engine("sqlite://", slow_query_ms=1e-6)
+    with caplog.at_level(logging.WARNING, logger="slow_query"), engine.connect() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("SELECT count(*) FROM t WHERE name LIKE :q"), {"q": "%x%"}).scalar()
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT missing FROM t"))
+        assert conn.info["query_started"] == []
+    engine.dispose()
+    [select_log] = [r.getMessage() for r in caplog.records if "SELECT count" in r.getMessage()]
+    assert "params=(str)" in select_log
+    assert "SCAN t" in select_log
@@ -23,3 +23,18 @@ def test_duplicate_email():
     r = client.post("/v1/users/register", json={"email":"dup@example.com","password":"password123","name":"B"})
     assert r.status_code == 409
     assert r.json()["success"] is False
+
+def test_create_app_is_lazy_and_lifespan_opens_db(tmp_path):
+    from common.config import Settings
+    from service_users.app.main import create_app
+    from service_users.app.migrate import migrate
+
+    db_file = tmp_path / "users.db"
+    app = create_app(Settings(database_url=f"sqlite:///{db_file}"))
+    assert not db_file.exists()
+
+    migrate(f"sqlite:///{db_file}")
+    with TestClient(app) as c:
+        assert app.state.startup_ms > 0
+        r = c.post("/v1/users/register", json={"email":"lazy@example.com","password":"password123","name":"Lazy"})
+        assert r.status_code == 200